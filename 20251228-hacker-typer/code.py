@@ -25,6 +25,7 @@ from scipy import stats
 from scipy.optimize import curve_fit
 from scipy.stats import linregress, pearsonr, spearmanr
 from scipy.interpolate import interp1d
+from scipy.signal import lfilter
 import statsmodels.api as sm
 from statsmodels.tsa.seasonal import seasonal_decompose
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
@@ -50,12 +51,19 @@ from folium.plugins import HeatMap
 # Database and I/O operations
 import sqlite3
 import json
+import zlib
+import hashlib
+import weakref
 import pickle
 import h5py
 from datetime import datetime, timedelta
 import calendar
+import time
+import tracemalloc
 import itertools
+import shutil
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 import os
 import sys
 import inspect
@@ -63,8 +71,9 @@ from pathlib import Path
 import logging
 import argparse
 import configparser
-from typing import List, Dict, Tuple, Optional, Union, Any, Callable
+from typing import List, Dict, Tuple, Optional, Union, Any, Callable, Iterator
 from dataclasses import dataclass, field
+from functools import partial, lru_cache
 from enum import Enum, auto
 
 # Visualization extensions
@@ -273,6 +282,510 @@ class PopulationProjectionModel:
         pass
 
 
+class CountryDictionary:
+    """Shared country/region code dictionary
+
+    Countries get stable integer codes in registration order (new names are
+    only ever appended), and every frame built through the dictionary shares
+    the same categorical dtypes, so grouping, filtering and joining work on
+    small integer codes instead of Python strings.
+    """
+
+    COUNTRY_COLUMNS = ('country', 'origin_country', 'destination_country')
+    REGION_COLUMNS = ('region', 'origin_region', 'destination_region')
+
+    def __init__(self, countries: List[str], regions: Dict[str, List[str]]):
+        self.regions = list(regions) + ['Other']
+        self.region_dtype = pd.CategoricalDtype(self.regions)
+        self._region_by_country = {country: region for region, members in regions.items()
+                                   for country in members}
+        self.countries = []
+        self.country_codes = {}
+        self.add_countries(countries)
+
+    def add_countries(self, countries) -> None:
+        """Register new country names (existing codes never change)"""
+        new = [c for c in pd.unique(np.asarray(countries, dtype=object))
+               if not pd.isna(c) and c not in self.country_codes]
+        if not new and self.countries:
+            return
+        for country in new:
+            self.country_codes[country] = len(self.countries)
+            self.countries.append(country)
+        self.country_dtype = pd.CategoricalDtype(self.countries)
+        region_index = {region: i for i, region in enumerate(self.regions)}
+        self.region_codes_by_country = np.array(
+            [region_index[self.region_of(c)] for c in self.countries], dtype=np.int16)
+
+    def region_of(self, country: str) -> str:
+        """Region name for a country ('Other' if unknown)"""
+        return self._region_by_country.get(country, 'Other')
+
+    def encode(self, countries) -> np.ndarray:
+        """Country codes for an array of names, registering unseen names"""
+        self.add_countries(countries)
+        return pd.Categorical(np.asarray(countries, dtype=object), dtype=self.country_dtype).codes
+
+    def country_categorical(self, codes: np.ndarray) -> pd.Categorical:
+        """Country categorical from an array of country codes"""
+        return pd.Categorical.from_codes(codes, dtype=self.country_dtype)
+
+    def region_categorical(self, country_codes: np.ndarray) -> pd.Categorical:
+        """Region categorical for an array of country codes"""
+        return pd.Categorical.from_codes(self.region_codes_by_country[country_codes], dtype=self.region_dtype)
+
+    def categorize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert any string country/region columns of a frame to the shared dtypes"""
+        converted = {}
+        for col in self.COUNTRY_COLUMNS:
+            if col in df.columns:
+                converted[col] = self.country_categorical(self.encode(df[col].astype(object)))
+        for col in self.REGION_COLUMNS:
+            if col in df.columns:
+                converted[col] = df[col].astype(self.region_dtype)
+        return df.assign(**converted) if converted else df
+
+
+def column_arrays(df: pd.DataFrame, columns) -> Tuple[Any, ...]:
+    """The arrays backing some columns of a frame (None for absent columns)
+    
+    Cache signatures hold these arrays, so their memory (and identity)
+    cannot be reused by a different column while the signature exists.
+    """
+    arrays = []
+    for col in columns:
+        column = df[col] if col in df.columns else None
+        if column is None:
+            arrays.append(None)
+        elif isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+            arrays.append(column.array)
+        else:
+            arrays.append(column.to_numpy())  # A view of the column's block
+    return tuple(arrays)
+
+
+def same_arrays(old: Tuple[Any, ...], new: Tuple[Any, ...]) -> bool:
+    """Whether two ``column_arrays`` results are backed by the same data"""
+    def same(a: Any, b: Any) -> bool:
+        if isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+            return (a.shape == b.shape and a.dtype == b.dtype and
+                    a.__array_interface__['data'] == b.__array_interface__['data'])
+        return a is b
+    return len(old) == len(new) and all(same(a, b) for a, b in zip(old, new))
+
+
+class CountrySliceIndex:
+    """Country -> contiguous row range over a frame grouped by country
+
+    Built once per frame (see ``for_frame``). When the frame is already
+    grouped by country with ascending years, as every generated panel is,
+    each country is a plain ``iloc`` range and ``get`` returns a zero-copy
+    view; otherwise the index keeps a (country, year) ordering and returns
+    the rows in that order. Only a weak reference to the frame is held;
+    the index is rebuilt when the rows or the country/year columns change,
+    including columns reassigned in place.
+    """
+
+    _cache: Dict[int, 'CountrySliceIndex'] = {}
+
+    def __init__(self, df: pd.DataFrame):
+        self._frame = weakref.ref(df)
+        self._signature = self._signature_of(df)
+
+        # Countries are numbered in order of first appearance
+        codes, uniques = pd.factorize(df['country'])
+        years = df['year'].to_numpy() if 'year' in df.columns else np.zeros(len(df))
+        grouped = (np.diff(codes) > 0) | ((np.diff(codes) == 0) & (np.diff(years) >= 0))
+        self.order = None if (codes >= 0).all() and grouped.all() else np.lexsort((years, codes))
+
+        sorted_codes = codes if self.order is None else codes[self.order]
+        starts = np.flatnonzero(np.diff(sorted_codes, prepend=-2) != 0)
+        stops = np.r_[starts[1:], len(df)]
+        self.slices = {uniques[code]: (start, stop) for code, start, stop
+                       in zip(sorted_codes[starts], starts, stops) if code >= 0}
+        self.countries = list(self.slices)
+
+    @classmethod
+    def for_frame(cls, df: pd.DataFrame) -> 'CountrySliceIndex':
+        """Cached index for a frame, rebuilt if the frame's rows have changed"""
+        index = cls._cache.get(id(df))
+        if index is None or not index.is_valid_for(df):
+            if index is None:
+                weakref.finalize(df, cls._cache.pop, id(df), None)
+            index = cls._cache[id(df)] = cls(df)
+        return index
+
+    @staticmethod
+    def _signature_of(df: pd.DataFrame) -> Tuple[int, pd.Index, Tuple[Any, ...]]:
+        """Row count, row index and the arrays backing the key columns"""
+        return len(df), df.index, column_arrays(df, ('country', 'year'))
+
+    def is_valid_for(self, df: pd.DataFrame) -> bool:
+        """Whether the index still describes ``df`` (same frame, rows and key columns)"""
+        length, row_index, arrays = self._signature
+        if not (self._frame() is df and len(df) == length and df.index is row_index):
+            return False
+        return same_arrays(arrays, column_arrays(df, ('country', 'year')))
+
+    def get(self, country: str) -> pd.DataFrame:
+        """Rows for one country (empty frame if absent)"""
+        df = self._frame()
+        start, stop = self.slices.get(country, (0, 0))
+        if self.order is None:
+            return df.iloc[start:stop]
+        return df.iloc[self.order[start:stop]]
+
+    def items(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Iterate (country, rows) pairs in index order"""
+        for country in self.countries:
+            yield country, self.get(country)
+
+    def __contains__(self, country: str) -> bool:
+        return country in self.slices
+
+    def __len__(self) -> int:
+        return len(self.slices)
+
+
+def country_slice(df: pd.DataFrame, country: str) -> pd.DataFrame:
+    """Rows of ``df`` for one country, through the frame's cached slice index"""
+    return CountrySliceIndex.for_frame(df).get(country)
+
+
+# ============================================================================
+# VECTORIZED NUMERICAL UTILITIES
+# ============================================================================
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_distance(lat1, lon1, lat2, lon2, radius: float = EARTH_RADIUS_KM) -> np.ndarray:
+    """Great-circle distance between coordinate arrays (broadcastable, degrees in, km out)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest_center_distance(lats: np.ndarray, lons: np.ndarray, centers: np.ndarray,
+                            kdtree_threshold: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance (km) and index of the nearest center for every point
+    
+    Few centers are handled by broadcasting the haversine formula over a
+    (points x centers) grid; many centers use a KD-tree on unit vectors,
+    whose chord distances map monotonically onto great-circle distances.
+    """
+    if len(centers) <= kdtree_threshold:
+        distances = haversine_distance(lats[:, None], lons[:, None], centers[None, :, 0], centers[None, :, 1])
+        nearest = distances.argmin(axis=1)
+        return distances[np.arange(len(lats)), nearest], nearest
+    
+    from scipy.spatial import cKDTree
+    
+    def to_unit_vectors(lat, lon):
+        lat, lon = np.radians(lat), np.radians(lon)
+        return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    
+    tree = cKDTree(to_unit_vectors(centers[:, 0], centers[:, 1]))
+    chord, nearest = tree.query(to_unit_vectors(lats, lons))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1)), nearest
+
+
+class PanelSegments:
+    """Per-entity segments of a panel sorted by (entity, time)
+
+    Each entity occupies one contiguous run of rows, so per-entity shifts
+    reduce to a single array shift plus masking of the rows whose source
+    would cross a segment boundary.
+    """
+
+    def __init__(self, keys: np.ndarray):
+        keys = np.asarray(keys)
+        codes = keys if np.issubdtype(keys.dtype, np.integer) else pd.factorize(keys)[0]
+        self.n_rows = len(codes)
+        self.starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1)) if self.n_rows else np.array([], int)
+        self.lengths = np.diff(np.r_[self.starts, self.n_rows])
+        self.segment_ids = np.repeat(np.arange(len(self.starts)), self.lengths)
+        # Offset of each row from the start / end of its segment
+        self.positions = np.arange(self.n_rows) - np.repeat(self.starts, self.lengths)
+        self.remaining = np.repeat(self.lengths, self.lengths) - self.positions - 1
+        # Rows without an entity key (NaN) never take part in shifts
+        self.keyed = codes >= 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, key: str = 'country') -> 'PanelSegments':
+        """Segments of a frame already sorted by (key, time)"""
+        column = df[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return cls(column.cat.codes.to_numpy())
+        return cls(column.to_numpy())
+
+    def shift(self, values: np.ndarray, periods: List[int]) -> np.ndarray:
+        """Per-segment shifts of a (rows, columns) array, as (rows, columns, periods)
+
+        Positive periods lag, negative periods lead; positions whose source
+        row lies outside the segment are NaN.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values.reshape(self.n_rows, -1)
+        shifted = np.full(values.shape + (len(periods),), np.nan)
+        for j, period in enumerate(periods):
+            if abs(period) >= self.n_rows:
+                continue
+            if period >= 0:
+                shifted[period:, :, j] = values[:self.n_rows - period]
+                outside = self.positions < period
+            else:
+                shifted[:period, :, j] = values[-period:]
+                outside = self.remaining < -period
+            shifted[outside | ~self.keyed, :, j] = np.nan
+        return shifted
+
+    def diff(self, values: np.ndarray, periods: List[int]) -> np.ndarray:
+        """Per-segment differences of a (rows, columns) array, as (rows, columns, periods)"""
+        values = np.asarray(values, dtype=float).reshape(self.n_rows, -1)
+        return values[:, :, None] - self.shift(values, periods)
+
+    def to_padded(self, values: np.ndarray) -> np.ndarray:
+        """Scatter (rows, columns) into a NaN-padded (segments, max length, columns) array"""
+        values = np.asarray(values, dtype=float).reshape(self.n_rows, -1)
+        max_length = self.lengths.max() if self.n_rows else 0
+        padded = np.full((len(self.starts), max_length, values.shape[1]), np.nan)
+        padded[self.segment_ids, self.positions] = values
+        return padded
+
+    def from_padded(self, padded: np.ndarray) -> np.ndarray:
+        """Gather a padded (segments, max length, ...) array back into row order"""
+        gathered = padded[self.segment_ids, self.positions]
+        gathered[~self.keyed] = np.nan
+        return gathered
+
+    def rolling_moments(self, values: np.ndarray,
+                        windows: List[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Trailing-window count, mean and sample variance of every column, for several windows"""
+        moments = self.padded_rolling_moments(self.to_padded(values), windows)
+        return {window: tuple(self.from_padded(m) for m in window_moments)
+                for window, window_moments in moments.items()}
+
+    @staticmethod
+    def padded_rolling_moments(padded: np.ndarray,
+                               windows: List[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Trailing-window count, mean and variance along axis 1 of a (segments, length, columns) array
+
+        Missing values are skipped as in pandas ``rolling``. Window counts and
+        means are differences of per-segment cumulative sums (over values
+        centered on their segment mean); variances take a second pass of
+        squared deviations from the window mean, which stays accurate on
+        strongly trending series where sum-of-squares formulas cancel.
+        """
+        valid = ~np.isnan(padded)
+        counts = valid.sum(axis=1, keepdims=True)
+        offset = np.where(valid, padded, 0).sum(axis=1, keepdims=True) / np.maximum(counts, 1)
+        centered = np.where(valid, padded - offset, 0)
+
+        def cumulative(x):
+            return np.concatenate([np.zeros_like(x[:, :1]), np.cumsum(x, axis=1)], axis=1)
+
+        cum_count = cumulative(valid.astype(float))
+        cum_sum = cumulative(centered)
+
+        length = padded.shape[1]
+        positions = np.arange(length)
+        moments = {}
+        for window in windows:
+            lower, upper = np.maximum(positions - window + 1, 0), positions + 1
+            count = cum_count[:, upper] - cum_count[:, lower]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = (cum_sum[:, upper] - cum_sum[:, lower]) / count
+            
+            # Squared deviations of each lagged value from the window mean
+            square = np.zeros_like(padded)
+            for lag in range(min(window, length)):
+                deviation = centered[:, :length - lag] - mean[:, lag:]
+                square[:, lag:] += np.where(valid[:, :length - lag], deviation ** 2, 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                variance = square / (count - 1)
+            moments[window] = (count, mean + offset, variance)
+        return moments
+
+    def ewm_mean(self, values: np.ndarray, spans: List[int]) -> np.ndarray:
+        """Per-segment exponentially weighted means, as (rows, columns, spans)"""
+        return self.from_padded(self.padded_ewm_mean(self.to_padded(values), spans))
+
+    @staticmethod
+    def padded_ewm_mean(padded: np.ndarray, spans: List[int]) -> np.ndarray:
+        """Exponentially weighted means along axis 1 of a (segments, length, columns) array, spans last
+
+        Matches pandas ``ewm(span=...).mean()`` with ``adjust=True``: the
+        weighted sum and the sum of weights of the valid observations are
+        both run through the recursion s_t = x_t + (1 - alpha) s_{t-1}.
+        """
+        valid = ~np.isnan(padded)
+        means = []
+        for span in spans:
+            decay = 1 - 2 / (span + 1)
+            weighted = lfilter([1.0], [1.0, -decay], np.where(valid, padded, 0), axis=1)
+            weights = lfilter([1.0], [1.0, -decay], valid.astype(float), axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                means.append(np.where(weights > 0, weighted / weights, np.nan))
+        return np.stack(means, axis=-1)
+
+    def interpolate(self, values: np.ndarray) -> np.ndarray:
+        """Per-segment linear interpolation of every column, filling both ends
+
+        Equivalent to ``interpolate(method='linear', limit_direction='both')``
+        within each segment: gaps are interpolated between the nearest valid
+        rows, leading/trailing gaps take the nearest valid value, and columns
+        with no valid value in a segment stay missing.
+        """
+        values = np.asarray(values, dtype=float).reshape(self.n_rows, -1)
+        valid = ~np.isnan(values)
+        rows = np.arange(self.n_rows)[:, None]
+        segment_start = np.repeat(self.starts, self.lengths)[:, None]
+        segment_end = segment_start + np.repeat(self.lengths, self.lengths)[:, None] - 1
+
+        # Nearest valid row at or before / at or after each row, within its segment
+        previous = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        following = np.minimum.accumulate(np.where(valid, rows, self.n_rows)[::-1], axis=0)[::-1]
+        has_previous = previous >= segment_start
+        has_following = following <= segment_end
+
+        columns = np.arange(values.shape[1])
+        previous_value = values[np.clip(previous, 0, None), columns]
+        following_value = values[np.clip(following, None, self.n_rows - 1), columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(following > previous, (rows - previous) / (following - previous), 0)
+        interpolated = previous_value + (following_value - previous_value) * fraction
+
+        filled = np.where(has_previous & has_following, interpolated,
+                          np.where(has_previous, previous_value,
+                                   np.where(has_following, following_value, np.nan)))
+        return np.where(valid | ~self.keyed[:, None], values, filled)
+
+
+class PopulationPanel:
+    """Long-format panel as a dense (entity, time, indicator) array with label indexes
+
+    ``from_frame`` scatters the rows onto the full entity x time grid with
+    one indexed assignment per indicator (cells without a row are NaN and
+    unset in ``present``); ``to_frame`` gathers the present cells back
+    into long format. Time operations run along axis 1 for every entity
+    and indicator at once, without grouping, and count periods in grid
+    steps: a year missing from an entity's history stays a gap instead of
+    joining its neighbours. Each returns a panel over the same labels.
+    """
+
+    def __init__(self, values: np.ndarray, entities: pd.Index, times: pd.Index, indicators: List[str],
+                 present: Optional[np.ndarray] = None, entity: str = 'country', time: str = 'year'):
+        self.values = values
+        self.entities, self.times, self.indicators = entities, times, pd.Index(indicators)
+        self.present = np.ones(values.shape[:2], dtype=bool) if present is None else present
+        self.entity, self.time = entity, time
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, indicators: Optional[List[str]] = None, entity: str = 'country',
+                   time: str = 'year', duplicates: str = 'raise') -> 'PopulationPanel':
+        """Panel of a long frame (by default every numeric column but the keys)
+
+        Entities and times are sorted (categoricals by category order) and
+        rows missing either key are left out. Several rows in one cell raise
+        a ``ValueError`` unless ``duplicates='mean'``, which averages their
+        non-missing values as ``pivot_table`` does.
+        """
+        if indicators is None:
+            indicators = [col for col in df.select_dtypes(include=[np.number, 'bool']).columns
+                          if col not in (entity, time)]
+        entity_codes, entities = pd.factorize(df[entity], sort=True)
+        time_codes, times = pd.factorize(df[time], sort=True)
+        keyed = (entity_codes >= 0) & (time_codes >= 0)
+        n_cells = len(entities) * len(times)
+        cells = entity_codes[keyed] * len(times) + time_codes[keyed]
+        counts = np.bincount(cells, minlength=n_cells)
+        if counts.max(initial=0) > 1 and duplicates != 'mean':
+            raise ValueError(f"Several rows share a ({entity}, {time}) cell; pass duplicates='mean' or a finer time column")
+        
+        values = np.full((len(entities), len(times), len(indicators)), np.nan)
+        flat = values.reshape(n_cells, len(indicators))
+        for j, col in enumerate(indicators):
+            column = df[col].to_numpy(dtype=float)[keyed]
+            if counts.max(initial=0) <= 1:
+                flat[cells, j] = column
+            else:
+                valid = ~np.isnan(column)
+                total = np.bincount(cells[valid], weights=column[valid], minlength=n_cells)
+                number = np.bincount(cells[valid], minlength=n_cells)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    flat[:, j] = np.where(number > 0, total / number, np.nan)
+        
+        present = (counts > 0).reshape(len(entities), len(times))
+        return cls(values, pd.Index(entities, name=entity), pd.Index(times, name=time), indicators,
+                   present, entity, time)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long frame of the present cells, sorted by entity and time (indicators as floats)"""
+        entity_codes, time_codes = np.nonzero(self.present)
+        keys = pd.DataFrame({self.entity: self.entities.take(entity_codes),
+                             self.time: self.times.take(time_codes)})
+        values = pd.DataFrame(self.values[entity_codes, time_codes], columns=self.indicators)
+        return pd.concat([keys, values], axis=1)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.values.shape
+
+    def wide(self, indicator: str) -> pd.DataFrame:
+        """Times x entities frame of one indicator, as ``pivot_table(index=time, columns=entity)``"""
+        return pd.DataFrame(self.values[:, :, self.indicators.get_loc(indicator)].T,
+                            index=self.times, columns=self.entities)
+
+    def for_entity(self, entity: Any) -> pd.DataFrame:
+        """Times x indicators frame of one entity"""
+        return pd.DataFrame(self.values[self.entities.get_loc(entity)], index=self.times, columns=self.indicators)
+
+    def select(self, indicators: List[str]) -> 'PopulationPanel':
+        """Panel of a subset of the indicators"""
+        return self._like(self.values[:, :, self.indicators.get_indexer(indicators)], indicators)
+
+    def _like(self, values: np.ndarray, indicators: Optional[List[str]] = None) -> 'PopulationPanel':
+        return PopulationPanel(values, self.entities, self.times,
+                               self.indicators if indicators is None else indicators,
+                               self.present, self.entity, self.time)
+
+    def shift(self, periods: int = 1) -> 'PopulationPanel':
+        """Values ``periods`` steps earlier (later when negative), NaN past either end"""
+        shifted = np.full_like(self.values, np.nan)
+        n_times = self.values.shape[1]
+        if 0 <= periods < n_times:
+            shifted[:, periods:] = self.values[:, :n_times - periods]
+        elif -n_times < periods < 0:
+            shifted[:, :periods] = self.values[:, -periods:]
+        return self._like(shifted)
+
+    def diff(self, periods: int = 1) -> 'PopulationPanel':
+        return self._like(self.values - self.shift(periods).values)
+
+    def pct_change(self, periods: int = 1) -> 'PopulationPanel':
+        """Relative change over ``periods`` steps (missing values are not filled)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._like(self.values / self.shift(periods).values - 1)
+
+    def rolling_mean(self, window: int, min_periods: Optional[int] = None) -> 'PopulationPanel':
+        """Trailing-window means over the non-missing values, as pandas ``rolling``"""
+        count, mean, _ = PanelSegments.padded_rolling_moments(self.values, [window])[window]
+        return self._like(np.where(count >= (window if min_periods is None else min_periods), mean, np.nan))
+
+    def rolling_std(self, window: int, min_periods: Optional[int] = None) -> 'PopulationPanel':
+        """Trailing-window sample standard deviations, as pandas ``rolling``"""
+        count, _, variance = PanelSegments.padded_rolling_moments(self.values, [window])[window]
+        with np.errstate(invalid='ignore'):
+            std = np.sqrt(variance)
+        return self._like(np.where(count >= (window if min_periods is None else min_periods), std, np.nan))
+
+    def ewm_mean(self, span: int) -> 'PopulationPanel':
+        """Exponentially weighted means, as pandas ``ewm(span=...).mean()``"""
+        return self._like(PanelSegments.padded_ewm_mean(self.values, [span])[..., 0])
+
+
 # ============================================================================
 # DATA GENERATION AND SIMULATION MODULE
 # ============================================================================
@@ -281,8 +794,13 @@ class PopulationDataGenerator:
     """Advanced population data generation and simulation"""
     
     def __init__(self, seed: int = 42):
-        """Initialize generator with random seed"""
-        np.random.seed(seed)
+        """Initialize generator with random seed
+        
+        No global random state is touched: every dataset (and every country
+        within it) draws from its own stream derived from ``seed``, so output
+        does not depend on call order, sharding or worker count.
+        """
+        self.seed = seed
         self.countries = [
             'United States', 'China', 'India', 'Japan', 'Germany', 
             'United Kingdom', 'France', 'Brazil', 'Italy', 'Canada',
@@ -296,267 +814,508 @@ class PopulationDataGenerator:
             'Oceania': ['Australia'],
             'South America': ['Brazil']
         }
+        # Shared country/region codes for every generated frame
+        self.country_dictionary = CountryDictionary(self.countries, self.regions)
         self.age_groups = ['0-4', '5-9', '10-14', '15-19', '20-24', '25-29', 
                           '30-34', '35-39', '40-44', '45-49', '50-54', 
                           '55-59', '60-64', '65-69', '70-74', '75-79', '80+']
+        self.age_starts = np.array([int(g.split('-')[0]) if '-' in g else 80 for g in self.age_groups])
+        self.age_ends = np.array([84 if g == '80+' else int(g.split('-')[1]) for g in self.age_groups])
+        # Country-specific age distributions, and their time-shifted variants
+        self.age_distributions = {
+            'developing': np.array([0.08, 0.07, 0.06, 0.06, 0.05, 0.05, 0.05, 0.05, 0.04,
+                                    0.04, 0.04, 0.04, 0.04, 0.04, 0.03, 0.02, 0.01]),
+            'developed': np.array([0.05, 0.05, 0.05, 0.05, 0.06, 0.06, 0.06, 0.06, 0.06,
+                                   0.06, 0.06, 0.06, 0.05, 0.05, 0.04, 0.03, 0.02]),
+            'aging': np.array([0.03, 0.03, 0.03, 0.04, 0.04, 0.04, 0.05, 0.05, 0.06,
+                               0.06, 0.07, 0.07, 0.07, 0.06, 0.05, 0.04, 0.03])
+        }
+        self._age_distribution_cache = {}
+        # Historical population anchors (year, millions), interpolated for timelines
+        self.historical_populations = {
+            'China': [(1950, 550), (1960, 660), (1970, 820), (1980, 980),
+                      (1990, 1140), (2000, 1260), (2010, 1340), (2020, 1420)],
+            'India': [(1950, 376), (1960, 449), (1970, 554), (1980, 696),
+                      (1990, 870), (2000, 1050), (2010, 1240), (2020, 1380)],
+            'United States': [(1950, 152), (1960, 180), (1970, 205), (1980, 227),
+                              (1990, 250), (2000, 282), (2010, 310), (2020, 331)],
+            'Japan': [(1950, 83), (1960, 93), (1970, 104), (1980, 117),
+                      (1990, 124), (2000, 127), (2010, 128), (2020, 126)]
+        }
+        # Historical event table: one row per (country, year range), in lookup priority order
+        event_defaults = {'impact': 0.0, 'conflict': 0.0, 'disaster': 0.0, 'crisis': 0.0, 'policy': 0.0,
+                          'technology': 0.0, 'disease': 0.0, 'education': 0.0, 'healthcare': 0.0}
+        self.historical_events = pd.DataFrame([
+            {**event_defaults, 'country': 'China', 'start_year': 1960, 'end_year': 1960,
+             'events': 'Great Leap Forward', 'impact': -0.2, 'crisis': 0.8},
+            {**event_defaults, 'country': 'China', 'start_year': 1978, 'end_year': 1978,
+             'events': 'Economic Reforms', 'impact': 0.3, 'policy': 0.9},
+            {**event_defaults, 'country': 'China', 'start_year': 2008, 'end_year': 2008,
+             'events': 'Beijing Olympics', 'impact': 0.1, 'technology': 0.5},
+            {**event_defaults, 'country': 'United States', 'start_year': 1964, 'end_year': 1973,
+             'events': 'Vietnam War', 'impact': -0.1, 'conflict': 0.7},
+            {**event_defaults, 'country': 'United States', 'start_year': 2008, 'end_year': 2008,
+             'events': 'Financial Crisis', 'impact': -0.2, 'crisis': 0.9},
+            {**event_defaults, 'country': 'United States', 'start_year': 2020, 'end_year': 2020,
+             'events': 'COVID-19 Pandemic', 'impact': -0.15, 'disease': 0.8},
+            {**event_defaults, 'country': 'Japan', 'start_year': 2011, 'end_year': 2011,
+             'events': 'Tsunami and Fukushima', 'impact': -0.25, 'disaster': 0.9}
+        ])
+        # Event table fields and the timeline columns they populate
+        self.event_columns = {
+            'events': 'major_events', 'impact': 'event_impact', 'conflict': 'war_conflict',
+            'disaster': 'natural_disaster', 'crisis': 'economic_crisis', 'policy': 'policy_change',
+            'technology': 'technological_breakthrough', 'disease': 'disease_outbreak',
+            'education': 'education_reform', 'healthcare': 'healthcare_improvement'
+        }
+        # Base population (millions) and growth trends used by the world panel
+        self.base_population = {
+            'USA': 150, 'China': 550, 'India': 350, 'Japan': 80, 'Germany': 70,
+            'UK': 50, 'France': 40, 'Brazil': 50, 'Italy': 45, 'Canada': 15,
+            'Russia': 100, 'South Korea': 25, 'Australia': 10, 'Spain': 30, 'Mexico': 25,
+            'Indonesia': 70, 'Netherlands': 10, 'Saudi Arabia': 5, 'Turkey': 25, 'Switzerland': 5
+        }
+        self.growth_factors = {
+            'China': 0.015, 'India': 0.018, 'United States': 0.008,
+            'Japan': 0.001, 'Germany': 0.002, 'United Kingdom': 0.005,
+            'Brazil': 0.012, 'Russia': 0.003, 'Australia': 0.013
+        }
+        self.aging_countries = ['Japan', 'Germany', 'Italy']
+        # Approximate geographic centroids (lat, lon) and integer country codes
+        self.country_centroids = {
+            'United States': (39.8, -98.6), 'China': (35.9, 104.2), 'India': (21.0, 78.0),
+            'Japan': (36.2, 138.3), 'Germany': (51.2, 10.4), 'United Kingdom': (54.0, -2.0),
+            'France': (46.2, 2.2), 'Brazil': (-14.2, -51.9), 'Italy': (41.9, 12.6),
+            'Canada': (56.1, -106.3), 'Russia': (61.5, 105.3), 'South Korea': (35.9, 127.8),
+            'Australia': (-25.3, 133.8), 'Spain': (40.5, -3.7), 'Mexico': (23.6, -102.6),
+            'Indonesia': (-0.8, 113.9), 'Netherlands': (52.1, 5.3), 'Saudi Arabia': (23.9, 45.1),
+            'Turkey': (39.0, 35.2), 'Switzerland': (46.8, 8.2)
+        }
+        self.country_codes = {country: i for i, country in enumerate(self.countries)}
+        # Symmetric great-circle distance matrix (km) indexed by country code
+        centroids = np.array([self.country_centroids[c] for c in self.countries])
+        self.distance_matrix = haversine_distance(centroids[:, None, 0], centroids[:, None, 1],
+                                                  centroids[None, :, 0], centroids[None, :, 1])
+        # Population cluster centers (lat, lon) for geographic simulation
+        self.cluster_centers = np.array([
+            (40.7, -74.0),   # New York
+            (51.5, -0.1),    # London
+            (35.7, 139.7),   # Tokyo
+            (19.1, 72.9),    # Mumbai
+            (-23.6, -46.7),  # Sao Paulo
+            (31.2, 121.5),   # Shanghai
+            (-33.9, 151.2),  # Sydney
+            (55.8, 37.6),    # Moscow
+            (48.9, 2.4),     # Paris
+            (52.5, 13.4)     # Berlin
+        ])
+        # Simplified country bounding boxes (lat_min, lat_max, lon_min, lon_max), in lookup priority order
+        country_boxes = [
+            ('United States', 24, 50, -125, -66),
+            ('China', 18, 54, 73, 136),
+            ('India', 8, 37, 68, 97),
+            ('Japan', 35, 46, 128, 146),
+            ('Germany', 47, 55, 6, 15),
+            ('United Kingdom', 50, 59, -8, 2),
+            ('France', 41, 52, -5, 10),
+            ('Brazil', -34, 5, -74, -35),
+            ('Italy', 36, 47, 6, 19),
+            ('Canada', 42, 83, -141, -52)
+        ]
+        self.country_bounds = {
+            'country_idx': np.array([self.countries.index(box[0]) for box in country_boxes]),
+            'lat_min': np.array([box[1] for box in country_boxes], dtype=float),
+            'lat_max': np.array([box[2] for box in country_boxes], dtype=float),
+            'lon_min': np.array([box[3] for box in country_boxes], dtype=float),
+            'lon_max': np.array([box[4] for box in country_boxes], dtype=float)
+        }
         
-    def generate_world_population_dataset(self, start_year: int = 1950, end_year: int = 2100) -> pd.DataFrame:
-        """Generate comprehensive world population dataset"""
+    def generate_world_population_dataset(self, start_year: int = 1950, end_year: int = 2100,
+                                          countries: Optional[List[str]] = None,
+                                          n_countries: Optional[int] = None,
+                                          steps_per_year: int = 1) -> pd.DataFrame:
+        """Generate comprehensive world population dataset
+        
+        Rows are ordered by (country, year). Passing a subset of ``countries``
+        yields exactly the rows the full panel holds for them, which lets the
+        panel be generated shard by shard. ``n_countries`` sizes the country
+        universe (see ``country_universe``) and ``steps_per_year`` > 1 adds
+        sub-annual rows with a ``period`` column.
+        """
         logger.info(f"Generating world population dataset from {start_year} to {end_year}")
         
-        years = range(start_year, end_year + 1)
-        countries = self.countries
+        countries = self.country_universe(n_countries) if countries is None else list(countries)
+        chunks = self.iter_world_population_chunks(start_year, end_year, countries=countries,
+                                                   steps_per_year=steps_per_year,
+                                                   countries_per_chunk=len(countries))
+        df = next(chunks)
         
-        data = []
-        for year in years:
-            for country in countries:
-                # Base population with realistic growth patterns
-                base_pop = {
-                    'USA': 150, 'China': 550, 'India': 350, 'Japan': 80, 'Germany': 70,
-                    'UK': 50, 'France': 40, 'Brazil': 50, 'Italy': 45, 'Canada': 15,
-                    'Russia': 100, 'South Korea': 25, 'Australia': 10, 'Spain': 30, 'Mexico': 25,
-                    'Indonesia': 70, 'Netherlands': 10, 'Saudi Arabia': 5, 'Turkey': 25, 'Switzerland': 5
-                }
-                
-                base = base_pop.get(country, 50) * 1e6  # Convert to actual numbers
-                
-                # Apply country-specific growth trends
-                growth_factors = {
-                    'China': 0.015, 'India': 0.018, 'United States': 0.008,
-                    'Japan': 0.001, 'Germany': 0.002, 'United Kingdom': 0.005,
-                    'Brazil': 0.012, 'Russia': 0.003, 'Australia': 0.013
-                }
-                
-                growth_rate = growth_factors.get(country, 0.01)
-                
-                # Adjust growth rate over time (demographic transition)
-                if year > 2000:
-                    growth_rate *= 0.9  # Slower growth in 21st century
-                if year > 2050:
-                    growth_rate *= 0.7  # Even slower in late 21st century
-                
-                # Calculate population with random variations
-                years_from_start = year - start_year
-                population = base * (1 + growth_rate) ** years_from_start
-                population *= np.random.uniform(0.98, 1.02)  # Add some randomness
-                
-                # Generate demographic metrics
-                birth_rate = np.random.normal(12, 4)  # Mean 12‰, std 4
-                death_rate = np.random.normal(8, 2)   # Mean 8‰, std 2
-                growth_rate_actual = birth_rate - death_rate
-                
-                # Age structure (pyramid shape)
-                median_age = np.random.normal(30, 10)
-                if country in ['Japan', 'Germany', 'Italy']:
-                    median_age = np.random.normal(45, 5)  # Older populations
-                
-                # Economic indicators
-                gdp_per_capita = np.random.lognormal(9, 1)  # Log-normal distribution
-                
-                # Urbanization (increasing over time)
-                urbanization_base = 0.3 if year <= 1970 else 0.5 if year <= 2000 else 0.7
-                urbanization_rate = urbanization_base + (year - start_year) * 0.005
-                urbanization_rate = min(urbanization_rate, 0.95)
-                
-                # Life expectancy (improving over time)
-                life_expectancy = 50 + (year - 1950) * 0.3 + np.random.normal(0, 3)
-                
-                # Fertility rate (declining over time)
-                fertility_rate = 5.0 - (year - 1950) * 0.03 + np.random.normal(0, 0.5)
-                fertility_rate = max(fertility_rate, 1.2)
-                
-                # Dependency ratios
-                dependency_ratio = 0.5 + np.random.normal(0, 0.1)
-                
-                row = {
-                    'year': year,
-                    'country': country,
-                    'region': self._get_region(country),
-                    'population': int(population),
-                    'population_density': np.random.lognormal(5, 1),
-                    'birth_rate': birth_rate,
-                    'death_rate': death_rate,
-                    'growth_rate': growth_rate_actual,
-                    'fertility_rate': fertility_rate,
-                    'life_expectancy': life_expectancy,
-                    'median_age': median_age,
-                    'dependency_ratio': dependency_ratio,
-                    'urbanization_rate': urbanization_rate,
-                    'gdp_per_capita': gdp_per_capita,
-                    'literacy_rate': 0.7 + (year - 1950) * 0.003 + np.random.normal(0, 0.05),
-                    'unemployment_rate': np.random.beta(2, 8) * 15,  # Beta distribution
-                    'poverty_rate': np.random.beta(3, 10) * 30,
-                    'healthcare_index': np.random.uniform(0.3, 0.95),
-                    'education_index': np.random.uniform(0.4, 0.98),
-                    'sex_ratio': np.random.normal(101, 3),  # Males per 100 females
-                    'migration_rate': np.random.normal(0, 2),
-                    'co2_emissions': np.random.lognormal(6, 1),  # Per capita
-                    'energy_consumption': np.random.lognormal(7, 0.8),
-                    'water_stress': np.random.beta(2, 5),
-                    'food_security': np.random.uniform(0.5, 1.0),
-                    'political_stability': np.random.uniform(-2.5, 2.5),
-                    'corruption_index': np.random.uniform(0, 100),
-                    'happiness_index': np.random.uniform(4, 8),
-                    'digital_adoption': np.random.uniform(0.1, 0.9) * (year - 1950) / 100
-                }
-                data.append(row)
-        
-        df = pd.DataFrame(data)
+        logger.info(f"Generated dataset with {len(df)} records")
+        return df
+    
+    def generate_world_population_parallel(self, start_year: int = 1950, end_year: int = 2100,
+                                           n_workers: Optional[int] = None,
+                                           n_countries: Optional[int] = None,
+                                           steps_per_year: int = 1) -> pd.DataFrame:
+        """Generate the world panel with country shards fanned out over a process pool"""
+        n_workers = n_workers or os.cpu_count() or 1
+        universe = np.array(self.country_universe(n_countries), dtype=object)
+        shards = [list(shard) for shard in np.array_split(universe, n_workers) if len(shard)]
+        logger.info(f"Generating world population dataset in {len(shards)} shards")
+        
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            frames = list(pool.map(self.generate_world_population_dataset,
+                                   itertools.repeat(start_year), itertools.repeat(end_year), shards,
+                                   itertools.repeat(None), itertools.repeat(steps_per_year)))
+        
+        return pd.concat(frames, ignore_index=True)
+    
+    def iter_world_population_chunks(self, start_year: int = 1950, end_year: int = 2100,
+                                     countries: Optional[List[str]] = None,
+                                     n_countries: Optional[int] = None,
+                                     steps_per_year: int = 1,
+                                     chunk_by: str = 'country',
+                                     countries_per_chunk: int = 50) -> Iterator[pd.DataFrame]:
+        """Yield the world panel in bounded-size chunks
+        
+        ``chunk_by='country'`` yields ``countries_per_chunk`` complete country
+        series at a time; ``chunk_by='decade'`` yields every country for one
+        decade at a time. Both draw from per-(country, decade) streams, so the
+        concatenated chunks are identical whichever way the panel is cut.
+        """
+        if chunk_by not in ('country', 'decade'):
+            raise ValueError(f"Unknown chunk_by: {chunk_by}")
+        
+        countries = self.country_universe(n_countries) if countries is None else list(countries)
+        self.country_dictionary.add_countries(countries)
+        decades = range((start_year // 10) * 10, end_year + 1, 10)
+        
+        # Last population seen per country, carried across decade chunks for population_change
+        last_population = {}
+        
+        if chunk_by == 'country':
+            for i in range(0, len(countries), countries_per_chunk):
+                blocks = [self._generate_country_block(country, decade, start_year, end_year, steps_per_year)
+                          for country in countries[i:i + countries_per_chunk]
+                          for decade in decades]
+                yield self._assemble_world_chunk(blocks, last_population)
+        else:
+            for decade in decades:
+                blocks = [self._generate_country_block(country, decade, start_year, end_year, steps_per_year)
+                          for country in countries]
+                yield self._assemble_world_chunk(blocks, last_population)
+    
+    def write_world_population_parquet(self, output_dir: str = 'output_data/world_population_parquet',
+                                       start_year: int = 1950, end_year: int = 2100,
+                                       n_countries: Optional[int] = None,
+                                       steps_per_year: int = 1,
+                                       chunk_by: str = 'country',
+                                       countries_per_chunk: int = 50) -> Path:
+        """Stream the world panel chunk by chunk into a partitioned Parquet dataset
+        
+        Only one chunk is held in memory at a time. Country chunks land in
+        ``country_chunk=NNNNN`` partitions, decade chunks in ``decade=YYYY``.
+        """
+        output_path = Path(output_dir)
+        shutil.rmtree(output_path, ignore_errors=True)
+        
+        total_rows = 0
+        chunks = self.iter_world_population_chunks(start_year, end_year, n_countries=n_countries,
+                                                   steps_per_year=steps_per_year, chunk_by=chunk_by,
+                                                   countries_per_chunk=countries_per_chunk)
+        for i, chunk in enumerate(chunks):
+            if chunk_by == 'country':
+                partition = output_path / f"country_chunk={i:05d}"
+            else:
+                partition = output_path / f"decade={(start_year // 10 + i) * 10}"
+            partition.mkdir(parents=True, exist_ok=True)
+            chunk.to_parquet(partition / 'part-00000.parquet', index=False)
+            total_rows += len(chunk)
+            logger.info(f"Wrote chunk {i} ({len(chunk)} rows) to {partition}")
+        
+        logger.info(f"Streamed {total_rows} records to {output_path}")
+        return output_path
+    
+    def country_universe(self, n_countries: Optional[int] = None) -> List[str]:
+        """Country names for a panel of ``n_countries`` (synthetic regions beyond the named set)"""
+        if n_countries is None or n_countries <= len(self.countries):
+            return self.countries[:n_countries]
+        synthetic = [f"Synthetic Region {i:05d}" for i in range(len(self.countries) + 1, n_countries + 1)]
+        # Register synthetic names up front so codes are fixed before any sharding
+        self.country_dictionary.add_countries(synthetic)
+        return self.countries + synthetic
+    
+    def _assemble_world_chunk(self, blocks: List[Dict[str, np.ndarray]],
+                              last_population: Dict[int, float]) -> pd.DataFrame:
+        """Stitch country/decade blocks into one frame and add calculated fields"""
+        columns = {col: np.concatenate([block[col] for block in blocks]) for col in blocks[0]}
+        
+        # Blocks carry country codes; expand them into the shared country/region categoricals
+        country = columns['country']
+        frame = {}
+        for col, values in columns.items():
+            if col == 'country':
+                frame['country'] = self.country_dictionary.country_categorical(country)
+                frame['region'] = self.country_dictionary.region_categorical(country)
+            else:
+                frame[col] = values
+        df = pd.DataFrame(frame)
+        
+        # Population change against the previous row of the same country, which
+        # for the first row of a country in this chunk may live in an earlier chunk
+        population = df['population'].to_numpy(dtype=float)
+        previous = np.roll(population, 1)
+        starts = np.flatnonzero(np.r_[True, country[1:] != country[:-1]])
+        previous[starts] = [last_population.get(c, np.nan) for c in country[starts]]
+        ends = np.r_[starts[1:], len(df)] - 1
+        last_population.update(zip(country[ends], population[ends]))
         
         # Add calculated fields
         df['natural_increase'] = df['birth_rate'] - df['death_rate']
         df['doubling_time'] = 70 / df['growth_rate'].clip(lower=0.1)
-        df['population_change'] = df.groupby('country')['population'].pct_change()
+        df['population_change'] = population / previous - 1
         df['gdp_total'] = df['population'] * df['gdp_per_capita']
         
-        logger.info(f"Generated dataset with {len(df)} records")
         return df
     
+    def _generate_country_block(self, country: str, decade: int, start_year: int, end_year: int,
+                                steps_per_year: int = 1) -> Dict[str, np.ndarray]:
+        """Draw every world-panel indicator for one country over one decade"""
+        rng = self._rng('world', country, decade)
+        
+        block_years = np.arange(max(decade, start_year), min(decade + 9, end_year) + 1)
+        years = np.repeat(block_years, steps_per_year)
+        periods = np.tile(np.arange(1, steps_per_year + 1), len(block_years))
+        time = years + (periods - 1) / steps_per_year
+        n_rows = len(years)
+        
+        # Apply country-specific growth trends
+        base = self.base_population.get(country, 50) * 1e6  # Convert to actual numbers
+        growth_rate = np.full(n_rows, self.growth_factors.get(country, 0.01))
+        
+        # Adjust growth rate over time (demographic transition)
+        growth_rate = np.where(years > 2000, growth_rate * 0.9, growth_rate)  # Slower growth in 21st century
+        growth_rate = np.where(years > 2050, growth_rate * 0.7, growth_rate)  # Even slower in late 21st century
+        
+        # Calculate population with random variations
+        population = base * (1 + growth_rate) ** (time - start_year)
+        population *= rng.uniform(0.98, 1.02, n_rows)  # Add some randomness
+        
+        # Generate demographic metrics
+        birth_rate = rng.normal(12, 4, n_rows)  # Mean 12‰, std 4
+        death_rate = rng.normal(8, 2, n_rows)   # Mean 8‰, std 2
+        
+        # Age structure (pyramid shape)
+        if country in self.aging_countries:
+            median_age = rng.normal(45, 5, n_rows)  # Older populations
+        else:
+            median_age = rng.normal(30, 10, n_rows)
+        
+        # Urbanization (increasing over time)
+        urbanization_base = np.where(years <= 1970, 0.3, np.where(years <= 2000, 0.5, 0.7))
+        urbanization_rate = np.minimum(urbanization_base + (time - start_year) * 0.005, 0.95)
+        
+        # Life expectancy (improving over time)
+        life_expectancy = 50 + (time - 1950) * 0.3 + rng.normal(0, 3, n_rows)
+        
+        # Fertility rate (declining over time)
+        fertility_rate = np.maximum(5.0 - (time - 1950) * 0.03 + rng.normal(0, 0.5, n_rows), 1.2)
+        
+        block = {'year': years}
+        if steps_per_year > 1:
+            block['period'] = periods
+        block.update({
+            'country': np.full(n_rows, self.country_dictionary.country_codes[country], dtype=np.int32),
+            'population': population.astype(np.int64),
+            'population_density': rng.lognormal(5, 1, n_rows),
+            'birth_rate': birth_rate,
+            'death_rate': death_rate,
+            'growth_rate': birth_rate - death_rate,
+            'fertility_rate': fertility_rate,
+            'life_expectancy': life_expectancy,
+            'median_age': median_age,
+            'dependency_ratio': 0.5 + rng.normal(0, 0.1, n_rows),
+            'urbanization_rate': urbanization_rate,
+            'gdp_per_capita': rng.lognormal(9, 1, n_rows),  # Log-normal distribution
+            'literacy_rate': 0.7 + (time - 1950) * 0.003 + rng.normal(0, 0.05, n_rows),
+            'unemployment_rate': rng.beta(2, 8, n_rows) * 15,  # Beta distribution
+            'poverty_rate': rng.beta(3, 10, n_rows) * 30,
+            'healthcare_index': rng.uniform(0.3, 0.95, n_rows),
+            'education_index': rng.uniform(0.4, 0.98, n_rows),
+            'sex_ratio': rng.normal(101, 3, n_rows),  # Males per 100 females
+            'migration_rate': rng.normal(0, 2, n_rows),
+            'co2_emissions': rng.lognormal(6, 1, n_rows),  # Per capita
+            'energy_consumption': rng.lognormal(7, 0.8, n_rows),
+            'water_stress': rng.beta(2, 5, n_rows),
+            'food_security': rng.uniform(0.5, 1.0, n_rows),
+            'political_stability': rng.uniform(-2.5, 2.5, n_rows),
+            'corruption_index': rng.uniform(0, 100, n_rows),
+            'happiness_index': rng.uniform(4, 8, n_rows),
+            'digital_adoption': rng.uniform(0.1, 0.9, n_rows) * (time - 1950) / 100
+        })
+        return block
+    
     def generate_age_structure_data(self, country: str, year: int) -> pd.DataFrame:
         """Generate detailed age structure/population pyramid data"""
         logger.info(f"Generating age structure for {country} in {year}")
-        
-        age_data = []
-        
-        # Country-specific age distributions
-        age_distributions = {
-            'developing': [0.08, 0.07, 0.06, 0.06, 0.05, 0.05, 0.05, 0.05, 0.04, 
-                          0.04, 0.04, 0.04, 0.04, 0.04, 0.03, 0.02, 0.01],
-            'developed': [0.05, 0.05, 0.05, 0.05, 0.06, 0.06, 0.06, 0.06, 0.06,
-                         0.06, 0.06, 0.06, 0.05, 0.05, 0.04, 0.03, 0.02],
-            'aging': [0.03, 0.03, 0.03, 0.04, 0.04, 0.04, 0.05, 0.05, 0.06,
-                     0.06, 0.07, 0.07, 0.07, 0.06, 0.05, 0.04, 0.03]
-        }
-        
-        # Determine distribution type
-        if country in ['Japan', 'Germany', 'Italy']:
-            dist_type = 'aging'
-        elif country in ['United States', 'United Kingdom', 'Canada', 'Australia']:
-            dist_type = 'developed'
-        else:
-            dist_type = 'developing'
-        
-        distribution = age_distributions[dist_type]
-        
-        # Apply time trend (aging population over time)
-        age_shift = (year - 1950) / 100  # Shift distribution to right over time
-        distribution = np.roll(distribution, int(age_shift * 3))
-        
-        # Generate data for each age group
+        return self.generate_age_structure_panel([country], [year])
+    
+    def generate_age_structure_cube(self, countries: Optional[List[str]] = None,
+                                    years: Optional[List[int]] = None) -> np.ndarray:
+        """Generate a country x year x age-group x sex (male, female) population cube"""
+        draws = self._draw_age_structure(countries, years)
+        return np.stack([draws['male_population'], draws['female_population']], axis=-1)
+    
+    def generate_age_structure_panel(self, countries: Optional[List[str]] = None,
+                                     years: Optional[List[int]] = None) -> pd.DataFrame:
+        """Generate tidy population pyramids for every (country, year) in one pass
+        
+        Rows are ordered by country, year and age group; each country draws
+        from its own stream over the requested years.
+        """
+        countries = self.countries if countries is None else list(countries)
+        years = np.arange(1950, 2101) if years is None else np.asarray(years)
+        logger.info(f"Generating age structure panel for {len(countries)} countries x {len(years)} years")
+        
+        draws = self._draw_age_structure(countries, years)
+        n_countries, n_years, n_groups = draws['total_population'].shape
+        codes = self.country_dictionary.encode(countries)
+        
+        return pd.DataFrame({
+            'country': self.country_dictionary.country_categorical(np.repeat(codes, n_years * n_groups)),
+            'year': np.tile(np.repeat(years, n_groups), n_countries),
+            'age_group': np.tile(np.array(self.age_groups, dtype=object), n_countries * n_years),
+            'age_start': np.tile(self.age_starts, n_countries * n_years),
+            'age_end': np.tile(self.age_ends, n_countries * n_years),
+            **{col: values.ravel() for col, values in draws.items()}
+        })
+    
+    def _draw_age_structure(self, countries: Optional[List[str]] = None,
+                            years: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+        """Draw every age-structure indicator as (country, year, age group) arrays"""
+        countries = self.countries if countries is None else list(countries)
+        years = np.arange(1950, 2101) if years is None else np.asarray(years)
+        shape = (len(years), len(self.age_groups))
         total_population = 1000000  # Base for proportions
+        age_start = self.age_starts
         
-        for i, age_group in enumerate(self.age_groups):
-            proportion = distribution[i] * np.random.uniform(0.9, 1.1)
-            male_prop = proportion * np.random.uniform(0.48, 0.52)
-            female_prop = proportion - male_prop
+        # Apply time trend (aging population over time): shift distribution to right
+        shifts = np.trunc((years - 1950) / 100 * 3).astype(int)
+        
+        columns = defaultdict(list)
+        for country in countries:
+            distribution = np.stack([self._shifted_age_distribution(self._age_distribution_type(country), shift)
+                                     for shift in shifts]).reshape(shape)
             
-            age_start = int(age_group.split('-')[0]) if '-' in age_group else 80
+            # One stream per (country, year), so a year's pyramid does not depend on the other years requested
+            draws = defaultdict(list)
+            for year in years:
+                rng = self._rng('age_structure', country, int(year))
+                draws['proportion'].append(rng.uniform(0.9, 1.1, len(age_start)))
+                draws['male_share'].append(rng.uniform(0.48, 0.52, len(age_start)))
+                draws['mortality'].append(rng.exponential(1 / (100 - age_start)))
+                draws['fertility'].append(rng.normal(0.1, 0.05, len(age_start)))
+                draws['labor'].append(np.where((age_start >= 20) & (age_start <= 65),
+                                               rng.beta(5, 2, len(age_start)), rng.beta(2, 5, len(age_start))))
+                draws['education'].append(rng.uniform(0.5, 1.0, len(age_start)))
+                draws['income'].append(rng.lognormal(10, 1, len(age_start)))
+            draws = {name: np.reshape(values, shape) for name, values in draws.items()}
             
-            age_data.append({
-                'country': country,
-                'year': year,
-                'age_group': age_group,
-                'age_start': age_start,
-                'age_end': 84 if age_group == '80+' else int(age_group.split('-')[1]),
-                'male_population': int(male_prop * total_population),
-                'female_population': int(female_prop * total_population),
-                'total_population': int(proportion * total_population),
-                'mortality_rate': np.random.exponential(1 / (100 - age_start)) if age_start < 100 else 0.2,
-                'fertility_rate': max(0, np.random.normal(0.1, 0.05) * (30 - age_start) if 15 <= age_start <= 45 else 0),
-                'labor_force_participation': np.random.beta(5, 2) if 20 <= age_start <= 65 else np.random.beta(2, 5),
-                'dependency_ratio': 1 if age_start < 15 or age_start >= 65 else 0,
-                'education_level': np.random.uniform(0.5, 1.0) * (1 - age_start/100),
-                'income_level': np.random.lognormal(10, 1) * (min(age_start, 60)/60)
-            })
-        
-        return pd.DataFrame(age_data)
+            proportion = distribution * draws['proportion']
+            male_prop = proportion * draws['male_share']
+            female_prop = proportion - male_prop
+            
+            columns['male_population'].append((male_prop * total_population).astype(np.int64))
+            columns['female_population'].append((female_prop * total_population).astype(np.int64))
+            columns['total_population'].append((proportion * total_population).astype(np.int64))
+            columns['mortality_rate'].append(draws['mortality'])
+            columns['fertility_rate'].append(np.where(
+                (age_start >= 15) & (age_start <= 45),
+                np.maximum(0, draws['fertility'] * (30 - age_start)), 0))
+            columns['labor_force_participation'].append(draws['labor'])
+            columns['dependency_ratio'].append(
+                np.broadcast_to(((age_start < 15) | (age_start >= 65)).astype(np.int64), shape))
+            columns['education_level'].append(draws['education'] * (1 - age_start / 100))
+            columns['income_level'].append(draws['income'] * (np.minimum(age_start, 60) / 60))
+        
+        return {col: np.stack(values) for col, values in columns.items()}
     
-    def generate_geographic_distribution_data(self) -> gpd.GeoDataFrame:
+    def _age_distribution_type(self, country: str) -> str:
+        """Determine age distribution type for a country"""
+        if country in self.aging_countries:
+            return 'aging'
+        elif country in ['United States', 'United Kingdom', 'Canada', 'Australia']:
+            return 'developed'
+        return 'developing'
+    
+    def _shifted_age_distribution(self, dist_type: str, shift: int) -> np.ndarray:
+        """Age distribution rolled right by ``shift`` groups (cached per type and shift)"""
+        key = (dist_type, shift)
+        if key not in self._age_distribution_cache:
+            self._age_distribution_cache[key] = np.roll(self.age_distributions[dist_type], shift)
+        return self._age_distribution_cache[key]
+    
+    def generate_geographic_distribution_data(self, n_locations: int = 500) -> gpd.GeoDataFrame:
         """Generate geographic population distribution data"""
         logger.info("Generating geographic distribution data")
         
         # Create synthetic geographic data
-        np.random.seed(42)
+        rng = self._rng('geographic')
         
         # Generate random points around the world
-        n_locations = 500
-        lats = np.random.uniform(-60, 80, n_locations)
-        lons = np.random.uniform(-180, 180, n_locations)
-        
-        # Create population clusters (simulating cities)
-        cluster_centers = [
-            (40.7, -74.0),   # New York
-            (51.5, -0.1),    # London
-            (35.7, 139.7),   # Tokyo
-            (19.1, 72.9),    # Mumbai
-            (-23.6, -46.7),  # Sao Paulo
-            (31.2, 121.5),   # Shanghai
-            (-33.9, 151.2),  # Sydney
-            (55.8, 37.6),    # Moscow
-            (48.9, 2.4),     # Paris
-            (52.5, 13.4)     # Berlin
-        ]
-        
-        data = []
-        for i in range(n_locations):
-            # Calculate distance to nearest cluster center
-            distances = [np.sqrt((lats[i] - c[0])**2 + (lons[i] - c[1])**2) for c in cluster_centers]
-            min_distance = min(distances)
-            
-            # Population density decays with distance from centers
-            base_density = np.random.lognormal(3, 1)
-            density = base_density * np.exp(-min_distance * 5)
-            
-            # Add some randomness
-            density *= np.random.uniform(0.5, 1.5)
-            
-            # Determine country based on coordinates
-            country = self._get_country_from_coords(lats[i], lons[i])
-            region = self._get_region(country)
-            
-            # Calculate urban/rural classification
-            if density > 1000:
-                area_type = 'Urban'
-            elif density > 100:
-                area_type = 'Suburban'
-            else:
-                area_type = 'Rural'
-            
-            # Economic indicators correlated with density
-            gdp_per_capita = np.random.lognormal(9, 0.5) * (1 + np.log1p(density)/10)
-            
-            data.append({
-                'location_id': f"LOC{i:04d}",
-                'country': country,
-                'region': region,
-                'latitude': lats[i],
-                'longitude': lons[i],
-                'population_density': density,
-                'total_population': int(density * np.random.uniform(0.5, 2) * 1000),
-                'urban_population': int(density * np.random.uniform(0.3, 0.9) * 1000) if area_type == 'Urban' else 0,
-                'rural_population': int(density * np.random.uniform(0.1, 0.7) * 1000) if area_type != 'Urban' else 0,
-                'area_km2': np.random.uniform(10, 10000),
-                'gdp_per_capita': gdp_per_capita,
-                'development_index': np.random.uniform(0.3, 0.95),
-                'climate_zone': np.random.choice(['Tropical', 'Arid', 'Temperate', 'Continental', 'Polar']),
-                'terrain_type': np.random.choice(['Coastal', 'Mountain', 'Plain', 'Plateau', 'Valley']),
-                'water_access': np.random.uniform(0.1, 1.0),
-                'agricultural_land': np.random.uniform(0, 0.8),
-                'forest_cover': np.random.uniform(0, 0.7),
-                'elevation': np.random.exponential(500),
-                'distance_to_coast': np.random.exponential(200),
-                'temperature': np.random.normal(15, 10),
-                'precipitation': np.random.exponential(1000),
-                'natural_hazards': np.random.poisson(0.5),
-                'infrastructure_quality': np.random.uniform(0.2, 0.95),
-                'healthcare_access': np.random.uniform(0.3, 0.98),
-                'education_access': np.random.uniform(0.4, 0.97),
-                'internet_penetration': np.random.beta(3, 2),
-                'transport_connectivity': np.random.uniform(0.1, 0.9),
-                'energy_availability': np.random.uniform(0.5, 1.0)
-            })
-        
-        df = pd.DataFrame(data)
+        lats = rng.uniform(-60, 80, n_locations)
+        lons = rng.uniform(-180, 180, n_locations)
+        
+        # Distance to nearest population cluster (simulated city), in degrees of arc
+        distance_km, _ = nearest_center_distance(lats, lons, self.cluster_centers)
+        min_distance = np.degrees(distance_km / EARTH_RADIUS_KM)
+        
+        # Population density decays with distance from centers, plus some randomness
+        density = rng.lognormal(3, 1, n_locations) * np.exp(-min_distance * 5)
+        density *= rng.uniform(0.5, 1.5, n_locations)
+        
+        # Determine country and region based on coordinates
+        country_idx = self._get_country_indices_from_coords(lats, lons, rng)
+        codes = self.country_dictionary.encode(self.countries)[country_idx]
+        
+        # Calculate urban/rural classification
+        is_urban = density > 1000
+        
+        # Economic indicators correlated with density
+        gdp_per_capita = rng.lognormal(9, 0.5, n_locations) * (1 + np.log1p(density) / 10)
+        
+        df = pd.DataFrame({
+            'location_id': np.char.add('LOC', np.char.zfill(np.arange(n_locations).astype(str), 4)),
+            'country': self.country_dictionary.country_categorical(codes),
+            'region': self.country_dictionary.region_categorical(codes),
+            'latitude': lats,
+            'longitude': lons,
+            'population_density': density,
+            'total_population': (density * rng.uniform(0.5, 2, n_locations) * 1000).astype(np.int64),
+            'urban_population': np.where(
+                is_urban, density * rng.uniform(0.3, 0.9, n_locations) * 1000, 0).astype(np.int64),
+            'rural_population': np.where(
+                ~is_urban, density * rng.uniform(0.1, 0.7, n_locations) * 1000, 0).astype(np.int64),
+            'area_km2': rng.uniform(10, 10000, n_locations),
+            'gdp_per_capita': gdp_per_capita,
+            'development_index': rng.uniform(0.3, 0.95, n_locations),
+            'climate_zone': rng.choice(['Tropical', 'Arid', 'Temperate', 'Continental', 'Polar'], n_locations),
+            'terrain_type': rng.choice(['Coastal', 'Mountain', 'Plain', 'Plateau', 'Valley'], n_locations),
+            'water_access': rng.uniform(0.1, 1.0, n_locations),
+            'agricultural_land': rng.uniform(0, 0.8, n_locations),
+            'forest_cover': rng.uniform(0, 0.7, n_locations),
+            'elevation': rng.exponential(500, n_locations),
+            'distance_to_coast': rng.exponential(200, n_locations),
+            'temperature': rng.normal(15, 10, n_locations),
+            'precipitation': rng.exponential(1000, n_locations),
+            'natural_hazards': rng.poisson(0.5, n_locations),
+            'infrastructure_quality': rng.uniform(0.2, 0.95, n_locations),
+            'healthcare_access': rng.uniform(0.3, 0.98, n_locations),
+            'education_access': rng.uniform(0.4, 0.97, n_locations),
+            'internet_penetration': rng.beta(3, 2, n_locations),
+            'transport_connectivity': rng.uniform(0.1, 0.9, n_locations),
+            'energy_availability': rng.uniform(0.5, 1.0, n_locations)
+        })
         
         # Create GeoDataFrame
         geometry = gpd.points_from_xy(df.longitude, df.latitude)
@@ -568,508 +1327,1849 @@ class PopulationDataGenerator:
         """Generate international migration flow data"""
         logger.info("Generating migration flow data")
         
-        countries = self.countries
-        years = range(2000, 2024)
-        
-        migration_data = []
+        codes = self.country_dictionary.encode(self.countries)
+        years = np.arange(2000, 2024)
+        n_countries = len(codes)
         
         # Create migration probability matrix
-        n_countries = len(countries)
-        migration_matrix = np.zeros((n_countries, n_countries))
+        regions = self.country_dictionary.region_codes_by_country[codes]
+        same_region = regions[:, None] == regions[None, :]
+        developed = np.arange(n_countries) < 10  # First 10 countries considered "developed"
+        off_diagonal = ~np.eye(n_countries, dtype=bool)
         
         # Higher migration between culturally/geographically close countries
-        for i in range(n_countries):
-            for j in range(n_countries):
-                if i != j:
-                    # Base migration probability
-                    prob = np.random.exponential(0.01)
-                    
-                    # Increase probability for same region
-                    if self._get_region(countries[i]) == self._get_region(countries[j]):
-                        prob *= 2
-                    
-                    # Increase for developed to developed
-                    if i < 10 and j < 10:  # First 10 countries considered "developed"
-                        prob *= 1.5
-                    
-                    migration_matrix[i, j] = prob
+        migration_matrix = self._rng('migration', 'matrix').exponential(0.01, (n_countries, n_countries))
+        migration_matrix *= np.where(same_region, 2.0, 1.0)
+        migration_matrix *= np.where(developed[:, None] & developed[None, :], 1.5, 1.0)
+        migration_matrix *= off_diagonal
         
         # Normalize rows
         migration_matrix = migration_matrix / migration_matrix.sum(axis=1, keepdims=True)
         
+        # Full (year, origin, destination) tensors, each year slice from its own stream
+        shape = (n_countries, n_countries)
+        draws = defaultdict(list)
         for year in years:
-            for i, origin in enumerate(countries):
-                for j, destination in enumerate(countries):
-                    if i != j:
-                        # Base flow
-                        base_flow = np.random.poisson(1000)
-                        
-                        # Apply migration probability
-                        flow = int(base_flow * migration_matrix[i, j] * np.random.uniform(0.8, 1.2))
-                        
-                        # Add time trend
-                        time_factor = 1 + (year - 2000) * 0.02
-                        flow = int(flow * time_factor)
-                        
-                        if flow > 0:
-                            migration_data.append({
-                                'year': year,
-                                'origin_country': origin,
-                                'destination_country': destination,
-                                'migrants': flow,
-                                'origin_region': self._get_region(origin),
-                                'destination_region': self._get_region(destination),
-                                'distance_km': self._calculate_distance(origin, destination),
-                                'gdp_ratio': np.random.lognormal(0, 0.5),
-                                'language_similarity': np.random.uniform(0, 1),
-                                'colonial_ties': np.random.choice([0, 1], p=[0.8, 0.2]),
-                                'visa_restrictions': np.random.choice([0, 0.5, 1], p=[0.3, 0.5, 0.2]),
-                                'conflict_in_origin': np.random.binomial(1, 0.1),
-                                'economic_opportunity': np.random.uniform(0, 1),
-                                'family_reunification': np.random.beta(2, 5),
-                                'education_opportunity': np.random.beta(3, 4)
-                            })
-        
-        return pd.DataFrame(migration_data)
+            rng = self._rng('migration', int(year))
+            draws['base_flow'].append(rng.poisson(1000, shape))
+            draws['noise'].append(rng.uniform(0.8, 1.2, shape))
+            draws['gdp_ratio'].append(rng.lognormal(0, 0.5, shape))
+            draws['language_similarity'].append(rng.uniform(0, 1, shape))
+            draws['colonial_ties'].append(rng.choice([0, 1], shape, p=[0.8, 0.2]))
+            draws['visa_restrictions'].append(rng.choice([0, 0.5, 1], shape, p=[0.3, 0.5, 0.2]))
+            draws['conflict_in_origin'].append(rng.binomial(1, 0.1, shape))
+            draws['economic_opportunity'].append(rng.uniform(0, 1, shape))
+            draws['family_reunification'].append(rng.beta(2, 5, shape))
+            draws['education_opportunity'].append(rng.beta(3, 4, shape))
+        tensors = {name: np.stack(slices) for name, slices in draws.items()}
+        
+        flows = (tensors['base_flow'] * migration_matrix * tensors['noise']).astype(np.int64)
+        
+        # Add time trend
+        time_factor = 1 + (years - 2000) * 0.02
+        flows = (flows * time_factor[:, None, None]).astype(np.int64)
+        
+        # Keep positive flows between distinct countries, in (year, origin, destination) order
+        flow_idx = np.nonzero((flows > 0) & off_diagonal)
+        year_idx, origin_idx, destination_idx = flow_idx
+        dictionary = self.country_dictionary
+        
+        return pd.DataFrame({
+            'year': years[year_idx],
+            'origin_country': dictionary.country_categorical(codes[origin_idx]),
+            'destination_country': dictionary.country_categorical(codes[destination_idx]),
+            'migrants': flows[flow_idx],
+            'origin_region': dictionary.region_categorical(codes[origin_idx]),
+            'destination_region': dictionary.region_categorical(codes[destination_idx]),
+            'distance_km': self.distance_matrix[origin_idx, destination_idx],
+            'gdp_ratio': tensors['gdp_ratio'][flow_idx],
+            'language_similarity': tensors['language_similarity'][flow_idx],
+            'colonial_ties': tensors['colonial_ties'][flow_idx],
+            'visa_restrictions': tensors['visa_restrictions'][flow_idx],
+            'conflict_in_origin': tensors['conflict_in_origin'][flow_idx],
+            'economic_opportunity': tensors['economic_opportunity'][flow_idx],
+            'family_reunification': tensors['family_reunification'][flow_idx],
+            'education_opportunity': tensors['education_opportunity'][flow_idx]
+        })
     
     def generate_historical_population_timeline(self, country: str) -> pd.DataFrame:
         """Generate historical population timeline for a specific country"""
         logger.info(f"Generating historical timeline for {country}")
+        return self.generate_historical_timelines([country])
+    
+    def generate_historical_timelines(self, countries: Optional[List[str]] = None) -> pd.DataFrame:
+        """Generate historical timelines for several countries in one pass
+        
+        Countries without historical reference data are skipped; rows are
+        ordered by (country, year).
+        """
+        countries = list(self.historical_populations) if countries is None else list(countries)
+        countries = [c for c in countries if c in self.historical_populations]
+        if not countries:
+            return pd.DataFrame()
+        
+        years = np.arange(1950, 2024)
+        n_years = len(years)
+        
+        # Interpolate populations and draw indicator noise per country stream
+        draws = defaultdict(list)
+        for country in countries:
+            base_data = np.array(self.historical_populations[country], dtype=float)
+            rng = self._rng('historical', country)
+            draws['population_millions'].append(np.interp(years, base_data[:, 0], base_data[:, 1]))
+            draws['birth_noise'].append(rng.normal(0, 2, n_years))
+            draws['death_noise'].append(rng.normal(0, 1, n_years))
+            draws['life_noise'].append(rng.normal(0, 2, n_years))
+            draws['gdp_noise'].append(rng.uniform(0.8, 1.2, n_years))
+        draws = {name: np.concatenate(values) for name, values in draws.items()}
+        
+        country_col = np.repeat(np.array(countries, dtype=object), n_years)
+        year_col = np.tile(years, len(countries))
+        elapsed = year_col - 1950
+        
+        df = pd.DataFrame({
+            'year': year_col,
+            'country': self.country_dictionary.country_categorical(
+                np.repeat(self.country_dictionary.encode(countries), n_years)),
+            'population_millions': draws['population_millions'],
+            'birth_rate': np.maximum(5, 40 - elapsed * 0.5 + draws['birth_noise']),
+            'death_rate': np.maximum(5, 20 - elapsed * 0.3 + draws['death_noise']),
+            'life_expectancy': 40 + elapsed * 0.35 + draws['life_noise'],
+            'urbanization_rate': np.minimum(0.9, 0.2 + elapsed * 0.01),
+            'gdp_per_capita': 1000 * (1.03 ** elapsed) * draws['gdp_noise']
+        })
+        
+        # Add historical events through an interval join on (country, year)
+        events = self._join_historical_events(country_col, year_col)
+        for key, column in self.event_columns.items():
+            df[column] = events[key]
         
-        # Historical population data (approximate)
-        historical_data = {
-            'China': [(1950, 550), (1960, 660), (1970, 820), (1980, 980), 
-                     (1990, 1140), (2000, 1260), (2010, 1340), (2020, 1420)],
-            'India': [(1950, 376), (1960, 449), (1970, 554), (1980, 696),
-                     (1990, 870), (2000, 1050), (2010, 1240), (2020, 1380)],
-            'United States': [(1950, 152), (1960, 180), (1970, 205), (1980, 227),
-                            (1990, 250), (2000, 282), (2010, 310), (2020, 331)],
-            'Japan': [(1950, 83), (1960, 93), (1970, 104), (1980, 117),
-                     (1990, 124), (2000, 127), (2010, 128), (2020, 126)]
-        }
+        return df
+    
+    def _join_historical_events(self, countries: np.ndarray, years: np.ndarray) -> pd.DataFrame:
+        """Vectorized interval join of (country, year) rows onto the event table
+        
+        Each row takes the first matching event in table order; rows without
+        an event get the neutral defaults.
+        """
+        table = self.historical_events
+        matches = ((countries[:, None] == table['country'].to_numpy()[None, :]) &
+                   (years[:, None] >= table['start_year'].to_numpy()[None, :]) &
+                   (years[:, None] <= table['end_year'].to_numpy()[None, :]))
+        has_event = matches.any(axis=1)
+        first = matches.argmax(axis=1)
+        
+        joined = {}
+        for key in self.event_columns:
+            values = table[key].to_numpy()[first]
+            joined[key] = np.where(has_event, values, '' if key == 'events' else 0.0)
+        return pd.DataFrame(joined)
+    
+    def _get_region(self, country: str) -> str:
+        """Get region for a country"""
+        return self.country_dictionary.region_of(country)
+    
+    def _rng(self, *keys: Union[str, int]) -> np.random.Generator:
+        """Independent random stream for a dataset/country/year key
+        
+        Keys are mixed into the seed's spawn key, so the same key always
+        yields the same stream regardless of which process asks for it.
+        """
+        spawn_key = tuple(zlib.crc32(k.encode('utf-8')) if isinstance(k, str) else int(k) for k in keys)
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=spawn_key))
+    
+    def _get_country_from_coords(self, lat: float, lon: float) -> str:
+        """Determine country from coordinates (simplified)"""
+        rng = self._rng('country_lookup', f"{lat:.6f},{lon:.6f}")
+        idx = self._get_country_indices_from_coords(np.array([lat]), np.array([lon]), rng)[0]
+        return self.countries[idx]
+    
+    def _get_country_indices_from_coords(self, lats: np.ndarray, lons: np.ndarray,
+                                         rng: np.random.Generator) -> np.ndarray:
+        """Vectorized country lookup against the bounding-box index
+        
+        Boxes are tested in priority order; points outside every box are
+        assigned a random country.
+        """
+        bounds = self.country_bounds
+        inside = ((lats[:, None] > bounds['lat_min']) & (lats[:, None] < bounds['lat_max']) &
+                  (lons[:, None] > bounds['lon_min']) & (lons[:, None] < bounds['lon_max']))
+        matched = inside.any(axis=1)
+        country_idx = np.where(matched, bounds['country_idx'][inside.argmax(axis=1)], -1)
+        country_idx[~matched] = rng.integers(0, len(self.countries), (~matched).sum())
+        return country_idx
+    
+    def _calculate_distance(self, country1: str, country2: str) -> float:
+        """Calculate approximate distance between countries"""
+        if country1 in self.country_codes and country2 in self.country_codes:
+            return self.distance_matrix[self.country_codes[country1], self.country_codes[country2]]
+        (lat1, lon1), (lat2, lon2) = self._get_centroid(country1), self._get_centroid(country2)
+        return float(haversine_distance(lat1, lon1, lat2, lon2))
+    
+    def _get_centroid(self, country: str) -> Tuple[float, float]:
+        """Centroid for a country, or a fixed pseudo-random location for synthetic regions"""
+        if country in self.country_centroids:
+            return self.country_centroids[country]
+        rng = self._rng('centroid', country)
+        return rng.uniform(-60, 80), rng.uniform(-180, 180)
+    
+    def compute_gravity_matrix(self, masses: np.ndarray, distance_decay: float = 2.0) -> np.ndarray:
+        """Gravity-model interaction matrix m_i * m_j / d_ij^k over the country distance matrix"""
+        masses = np.asarray(masses, dtype=float)
+        with np.errstate(divide='ignore'):
+            gravity = np.outer(masses, masses) / self.distance_matrix ** distance_decay
+        np.fill_diagonal(gravity, 0)
+        return gravity
+    
+    def _get_historical_events(self, country: str, year: int) -> Dict[str, Any]:
+        """Get historical events for a country in a given year"""
+        events = self._join_historical_events(np.array([country], dtype=object), np.array([year]))
+        return events.iloc[0].to_dict()
+
+
+# ============================================================================
+# DATA PROCESSING AND FEATURE ENGINEERING MODULE
+# ============================================================================
+
+class FeatureFrame:
+    """Read view over a sorted panel plus the feature columns added by pipeline stages
+
+    Stages read columns with ``frame[col]`` (base or previously added) and
+    return only the columns they create; nothing is inserted into the base
+    frame until ``materialize`` builds the output in a single concat.
+    """
+
+    BLOCK_COLUMNS = 64
+
+    def __init__(self, base: pd.DataFrame):
+        self.base = base
+        self.index = base.index
+        self.added: Dict[str, pd.Series] = {}
+        self.compaction: Dict[str, float] = {}
+        self._segments = None
+
+    @staticmethod
+    def sort_panel(df: pd.DataFrame) -> pd.DataFrame:
+        """Sort by (country, year), returning the frame itself if it is already sorted"""
+        if len(df) > 1:
+            country = df['country']
+            keys = country.cat.codes.to_numpy() if isinstance(country.dtype, pd.CategoricalDtype) else country.to_numpy()
+            years = df['year'].to_numpy()
+            same = keys[1:] == keys[:-1]
+            if not np.all((keys[1:] > keys[:-1]) | (same & (years[1:] >= years[:-1]))):
+                return df.sort_values(['country', 'year'])
+        return df
+
+    @property
+    def segments(self) -> PanelSegments:
+        """Country segments of the base frame (built on first use)"""
+        if self._segments is None:
+            self._segments = PanelSegments.from_frame(self.base)
+        return self._segments
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.base.columns) + [col for col in self.added if col not in self.base.columns]
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.added or col in self.base.columns
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def __getitem__(self, col: str) -> pd.Series:
+        return self.added[col] if col in self.added else self.base[col]
+
+    def values(self, cols: List[str]) -> np.ndarray:
+        """Float (rows, columns) array of several columns"""
+        return np.column_stack([self[col].to_numpy(dtype=float) for col in cols])
+
+    def select_dtypes(self, include=None, exclude=None) -> List[str]:
+        """Column names matching ``DataFrame.select_dtypes`` over the current columns"""
+        empty = pd.DataFrame({col: self[col].iloc[:0] for col in self.columns})
+        return list(empty.select_dtypes(include=include, exclude=exclude).columns)
+
+    def add(self, columns: Dict[str, Any]) -> None:
+        """Register a stage's new (or replacement) columns without copying them"""
+        for col, values in columns.items():
+            if not isinstance(values, pd.Series):
+                values = pd.Series(values, index=self.index, name=col, copy=False)
+            self.added[col] = values
+
+    @staticmethod
+    def compact_values(values: pd.Series) -> pd.Series:
+        """Column in a compact dtype: float32, the narrowest integer, or categorical for strings"""
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+            return values.astype(np.float32)
+        if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+            return pd.to_numeric(values, downcast='integer' if dtype.kind == 'i' else 'unsigned')
+        if pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+            return values.astype('category')
+        return values
+
+    def materialize(self, compact: bool = False) -> pd.DataFrame:
+        """Base columns (with replacements) followed by all added columns, built once
+
+        Consecutive numeric columns of one dtype are packed into 2-D blocks of
+        at most ``BLOCK_COLUMNS`` columns, and each stage column is released
+        as soon as it is copied, so the peak stays near one copy of the
+        output. Consumes the added columns. With ``compact`` every column
+        goes through ``compact_values`` and ``compaction`` records the
+        memory before and after.
+        """
+        replaced = {col: self.added.pop(col) for col in list(self.added) if col in self.base.columns}
+        base = self.base.assign(**replaced) if replaced else self.base
+        
+        if compact:
+            before = base.memory_usage(deep=True, index=False).sum()
+            base = base.assign(**{col: self.compact_values(base[col]) for col in base.columns})
+            for col in list(self.added):
+                before += self.added[col].memory_usage(deep=True, index=False)
+                self.added[col] = self.compact_values(self.added[col])
+        
+        blocks = []
+        for dtype, run in itertools.groupby(list(self.added), key=lambda col: self.added[col].dtype):
+            cols = list(run)
+            if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+                for start in range(0, len(cols), self.BLOCK_COLUMNS):
+                    chunk = cols[start:start + self.BLOCK_COLUMNS]
+                    block = np.empty((len(chunk), len(self)), dtype=dtype)
+                    for i, col in enumerate(chunk):
+                        block[i] = self.added.pop(col).to_numpy()
+                    blocks.append(pd.DataFrame(block.T, index=self.index, columns=chunk, copy=False))
+            else:
+                blocks.append(pd.DataFrame({col: self.added.pop(col) for col in cols}, index=self.index))
+        result = pd.concat([base] + blocks, axis=1)
+        
+        if compact:
+            after = result.memory_usage(deep=True, index=False).sum()
+            self.compaction = {'memory_before_mb': float(before) / 1e6, 'memory_after_mb': float(after) / 1e6}
+        return result
+
+
+class FeaturePipeline:
+    """Ordered feature stages evaluated over one FeatureFrame
+
+    ``run`` sorts the input once by (country, year), lets every stage add
+    its columns to the frame, and materializes the result at the end.
+    ``report`` holds the wall time, new-column count and traced peak
+    memory of each stage from the last run.
+    """
+
+    def __init__(self, track_memory: bool = True):
+        self.stages: List[Tuple[str, Callable[[FeatureFrame], Dict[str, Any]]]] = []
+        self.track_memory = track_memory
+        self.report: List[Dict[str, Any]] = []
+
+    def add_stage(self, name: str, stage: Callable[[FeatureFrame], Dict[str, Any]]) -> 'FeaturePipeline':
+        """Append a stage; returns the pipeline for chaining"""
+        self.stages.append((name, stage))
+        return self
+
+    def run(self, df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+        """Run every stage and return the materialized frame (in compact dtypes with ``compact``)"""
+        self.report = []
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            frame = self._measure('sort', lambda: FeatureFrame(FeatureFrame.sort_panel(df)))
+            for name, stage in self.stages:
+                columns = self._measure(name, lambda: stage(frame))
+                frame.add(columns)
+                self.report[-1]['new_columns'] = len(columns)
+            result = self._measure('materialize', lambda: frame.materialize(compact))
+            self.report[-1].update(frame.compaction)
+            return result
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    def _measure(self, name: str, func: Callable[[], Any]) -> Any:
+        """Call ``func`` and record its wall time and peak traced allocation"""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func()
+        entry = {'stage': name, 'seconds': time.perf_counter() - start}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            entry['peak_mb'] = (peak - baseline) / 1e6
+            entry['retained_mb'] = (current - baseline) / 1e6
+        self.report.append(entry)
+        logger.info(f"Pipeline stage {name}: {entry['seconds']:.3f}s" +
+                    (f", peak {entry['peak_mb']:.1f} MB" if tracing else ""))
+        return result
+
+
+@dataclass
+class DesignMatrix:
+    """Training features as a dense numeric frame beside a sparse one-hot block
+
+    The one-hot block stays a SciPy CSR matrix end to end; ``to_sparse``
+    joins both parts for estimators that accept sparse input.
+    """
+    dense: pd.DataFrame
+    one_hot: Any  # scipy.sparse.csr_matrix
+    one_hot_columns: List[str]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.dense.columns) + self.one_hot_columns
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.dense), len(self.dense.columns) + len(self.one_hot_columns)
+
+    def __len__(self) -> int:
+        return len(self.dense)
+
+    def rows(self, positions) -> 'DesignMatrix':
+        """Rows by position (slice, integer or boolean array)"""
+        return DesignMatrix(self.dense.iloc[positions], self.one_hot[positions], self.one_hot_columns)
+
+    def to_sparse(self, dense_values: Optional[np.ndarray] = None) -> Any:
+        """CSR matrix of the dense block (or ``dense_values`` in its place) followed by the one-hot block"""
+        from scipy import sparse
+        
+        dense_values = self.dense.to_numpy(dtype=float) if dense_values is None else dense_values
+        return sparse.hstack([sparse.csr_matrix(dense_values), self.one_hot], format='csr')
+
+
+@dataclass
+class TrainingMatrix:
+    """Numeric training features in one C-contiguous array, with a cached standardized copy"""
+    values: np.ndarray
+    columns: List[str]
+    _standardized: Dict[int, Tuple[np.ndarray, StandardScaler]] = field(default_factory=dict, repr=False)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def standardized(self, n_train: int) -> Tuple[np.ndarray, StandardScaler]:
+        """All rows scaled by a ``StandardScaler`` fitted on the first ``n_train`` rows (computed once)"""
+        if n_train not in self._standardized:
+            scaler = StandardScaler().fit(self.values[:n_train])
+            self._standardized[n_train] = (scaler.transform(self.values), scaler)
+        return self._standardized[n_train]
+
+    def scaled_by(self, scaler: StandardScaler) -> np.ndarray:
+        """All rows scaled by ``scaler``, reusing the cached array if it was fitted by ``standardized``"""
+        for scaled, fitted in self._standardized.values():
+            if fitted is scaler:
+                return scaled
+        return scaler.transform(self.values)
+
+
+class FittedPreprocessor:
+    """Training statistics for robust scaling and categorical encoding
+
+    ``fit_scaling`` and ``fit_encoding`` record the statistics from a
+    training frame (the quantiles in one batched ``np.nanquantile`` pass);
+    ``scaled_columns`` and ``encoded_columns`` apply them to any frame, so
+    new or incremental data is transformed exactly like the training data
+    without another statistics pass. Other frame-wide values the feature
+    stages use (fill medians, maxima) are kept through ``statistic``.
+    
+    One-hot encodings come from a single code matrix over the learned
+    vocabularies (``one_hot_matrix``). With ``sparse_one_hot`` the feature
+    frame gets no dummy columns and training data carries the dummies as
+    one CSR block instead.
+    """
+
+    STAGE_ORDER = {'Low Income': 0, 'Lower Middle': 1, 'Upper Middle': 2, 'High Income': 3}
+    MAX_ONE_HOT_CATEGORIES = 10
+    
+    # Reductions behind the frame-wide statistics
+    REDUCTIONS: Dict[str, Callable[[pd.Series], Any]] = {
+        'median': pd.Series.median,
+        'max': pd.Series.max,
+        'mode': lambda values: next(iter(values.mode()), 'Unknown'),
+    }
+
+    def __init__(self, sparse_one_hot: bool = False):
+        self.sparse_one_hot = sparse_one_hot
+        self.scale_columns: List[str] = []
+        self.medians = np.array([])
+        self.iqrs = np.array([])
+        self.country_means: Dict[str, float] = {}
+        self.region_codes: Dict[str, int] = {}
+        self.one_hot_categories: Dict[str, List[str]] = {}
+        self.statistics: Dict[str, Any] = {}
+        self.fitted_scaling = False
+        self.fitted_encoding = False
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.fitted_scaling and self.fitted_encoding
+
+    def statistic(self, name: str, values: pd.Series, reduce: str, fit: bool) -> Any:
+        """Frame-wide ``reduce`` of ``values``: computed and recorded when fitting, the recorded value otherwise"""
+        if fit:
+            self.statistics[name] = self.REDUCTIONS[reduce](values)
+            return self.statistics[name]
+        return self.statistics[name] if name in self.statistics else self.REDUCTIONS[reduce](values)
+
+    def fit_scaling(self, frame: FeatureFrame, cols: List[str], block_columns: int = FeatureFrame.BLOCK_COLUMNS) -> None:
+        """Median and IQR of every column, keeping only columns with spread"""
+        medians, iqrs, keep = [], [], []
+        for start in range(0, len(cols), block_columns):
+            block = frame.values(cols[start:start + block_columns])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN columns
+                q25, median, q75 = np.nanquantile(block, [0.25, 0.5, 0.75], axis=0)
+                std = np.nanstd(block, axis=0, ddof=1)
+            iqr = q75 - q25
+            medians.append(median)
+            iqrs.append(iqr)
+            keep.append((std > 0) & (iqr > 0))
+        keep = np.concatenate(keep) if keep else np.array([], dtype=bool)
+        self.scale_columns = [col for col, kept in zip(cols, keep) if kept]
+        self.medians = np.concatenate(medians)[keep] if medians else np.array([])
+        self.iqrs = np.concatenate(iqrs)[keep] if iqrs else np.array([])
+        self.fitted_scaling = True
+
+    def scaled_columns(self, frame: FeatureFrame, cols: Optional[set] = None) -> Dict[str, np.ndarray]:
+        """``{col}_scaled`` columns using the fitted medians and IQRs (every fitted column, or ``cols``)"""
+        positions = np.array([i for i, col in enumerate(self.scale_columns) if cols is None or col in cols], dtype=int)
+        columns = {}
+        for start in range(0, len(positions), FeatureFrame.BLOCK_COLUMNS):
+            block_positions = positions[start:start + FeatureFrame.BLOCK_COLUMNS]
+            names = [self.scale_columns[i] for i in block_positions]
+            block = (frame.values(names) - self.medians[block_positions]) / self.iqrs[block_positions]
+            columns.update({f'{col}_scaled': block[:, i] for i, col in enumerate(names)})
+        return columns
+
+    def fit_encoding(self, frame: FeatureFrame) -> None:
+        """Country target means, region codes and one-hot vocabularies"""
+        if 'country' in frame:
+            means = frame['population'].groupby(frame['country'], observed=True).mean()
+            self.country_means = {str(country): float(mean) for country, mean in means.items()}
+        if 'region' in frame and not isinstance(frame['region'].dtype, pd.CategoricalDtype):
+            self.region_codes = {region: i for i, region in enumerate(frame['region'].unique())}
+        
+        # Categories after the first (drop_first) of every low-cardinality text column
+        self.one_hot_categories = {}
+        for col in frame.select_dtypes(include=['object']):
+            if col not in ['country', 'region'] and frame[col].nunique() <= self.MAX_ONE_HOT_CATEGORIES:
+                self.one_hot_categories[col] = sorted(frame[col].dropna().unique())[1:]
+        self.fitted_encoding = True
+
+    def encoded_columns(self, frame: FeatureFrame, keys: Optional[set] = None) -> Dict[str, Any]:
+        """Encoded categorical columns using the fitted vocabularies
         
-        data = []
+        ``keys`` restricts the output to the named encodings (``country_encoded``,
+        ``region_encoded``, ``development_stage_encoded``) and one-hot source columns.
+        """
+        columns = {}
         
-        if country in historical_data:
-            base_data = historical_data[country]
-            
-            # Interpolate for all years
-            years = np.arange(1950, 2024)
-            populations = np.interp(years, 
-                                   [d[0] for d in base_data], 
-                                   [d[1] for d in base_data])
-            
-            for year, pop in zip(years, populations):
-                # Add historical events
-                historical_events = self._get_historical_events(country, year)
-                
-                data.append({
-                    'year': int(year),
-                    'country': country,
-                    'population_millions': pop,
-                    'birth_rate': max(5, 40 - (year - 1950) * 0.5 + np.random.normal(0, 2)),
-                    'death_rate': max(5, 20 - (year - 1950) * 0.3 + np.random.normal(0, 1)),
-                    'life_expectancy': 40 + (year - 1950) * 0.35 + np.random.normal(0, 2),
-                    'urbanization_rate': min(0.9, 0.2 + (year - 1950) * 0.01),
-                    'gdp_per_capita': 1000 * (1.03 ** (year - 1950)) * np.random.uniform(0.8, 1.2),
-                    'major_events': historical_events['events'],
-                    'event_impact': historical_events['impact'],
-                    'war_conflict': historical_events['conflict'],
-                    'natural_disaster': historical_events['disaster'],
-                    'economic_crisis': historical_events['crisis'],
-                    'policy_change': historical_events['policy'],
-                    'technological_breakthrough': historical_events['technology'],
-                    'disease_outbreak': historical_events['disease'],
-                    'education_reform': historical_events['education'],
-                    'healthcare_improvement': historical_events['healthcare']
-                })
+        def wanted(key: str) -> bool:
+            return keys is None or key in keys
         
-        return pd.DataFrame(data)
-    
-    def _get_region(self, country: str) -> str:
-        """Get region for a country"""
-        for region, countries in self.regions.items():
-            if country in countries:
-                return region
-        return 'Other'
-    
-    def _get_country_from_coords(self, lat: float, lon: float) -> str:
-        """Determine country from coordinates (simplified)"""
-        # Simplified geographic assignment
-        if 24 < lat < 50 and -125 < lon < -66:
-            return 'United States'
-        elif 18 < lat < 54 and 73 < lon < 136:
-            return 'China'
-        elif 8 < lat < 37 and 68 < lon < 97:
-            return 'India'
-        elif 35 < lat < 46 and 128 < lon < 146:
-            return 'Japan'
-        elif 47 < lat < 55 and 6 < lon < 15:
-            return 'Germany'
-        elif 50 < lat < 59 and -8 < lon < 2:
-            return 'United Kingdom'
-        elif 41 < lat < 52 and -5 < lon < 10:
-            return 'France'
-        elif -34 < lat < 5 and -74 < lon < -35:
-            return 'Brazil'
-        elif 36 < lat < 47 and 6 < lon < 19:
-            return 'Italy'
-        elif 42 < lat < 83 and -141 < lon < -52:
-            return 'Canada'
-        else:
-            return np.random.choice(self.countries)
-    
-    def _calculate_distance(self, country1: str, country2: str) -> float:
-        """Calculate approximate distance between countries"""
-        # Simplified distances (in km)
-        distances = {
-            ('United States', 'Canada'): 2000,
-            ('United States', 'Mexico'): 3000,
-            ('Germany', 'France'): 1000,
-            ('China', 'Japan'): 2000,
-            ('India', 'China'): 3000,
-            ('United Kingdom', 'United States'): 6000,
-            ('Australia', 'United Kingdom'): 17000,
-        }
+        # Country encoding (target encoding based on average population)
+        if 'country' in frame and wanted('country_encoded'):
+            columns['country_encoded'] = self._lookup(frame['country'], self.country_means)
+        
+        # Region encoding (shared dictionary codes when the column is categorical)
+        if 'region' in frame and wanted('region_encoded'):
+            region = frame['region']
+            if isinstance(region.dtype, pd.CategoricalDtype):
+                columns['region_encoded'] = region.cat.codes.astype(np.int64)
+            else:
+                columns['region_encoded'] = region.map(self.region_codes)
         
-        key = tuple(sorted([country1, country2]))
-        return distances.get(key, np.random.uniform(1000, 15000))
-    
-    def _get_historical_events(self, country: str, year: int) -> Dict[str, Any]:
-        """Get historical events for a country in a given year"""
-        events = {
-            'events': '',
-            'impact': 0,
-            'conflict': 0,
-            'disaster': 0,
-            'crisis': 0,
-            'policy': 0,
-            'technology': 0,
-            'disease': 0,
-            'education': 0,
-            'healthcare': 0
-        }
+        # Development stage encoding
+        if 'development_stage' in frame and wanted('development_stage_encoded'):
+            columns['development_stage_encoded'] = frame['development_stage'].map(self.STAGE_ORDER)
         
-        # Country-specific historical events
-        if country == 'China':
-            if year == 1960:
-                events.update({'events': 'Great Leap Forward', 'impact': -0.2, 'crisis': 0.8})
-            elif year == 1978:
-                events.update({'events': 'Economic Reforms', 'impact': 0.3, 'policy': 0.9})
-            elif year == 2008:
-                events.update({'events': 'Beijing Olympics', 'impact': 0.1, 'technology': 0.5})
+        # One-hot encoding for other categoricals, as bool views of one uint8 matrix
+        one_hot_sources = [col for col in self.one_hot_categories if wanted(col)]
+        if one_hot_sources and not self.sparse_one_hot:
+            matrix = self.one_hot_matrix(frame, one_hot_sources, sparse=False).view(bool)
+            columns.update(zip(self.one_hot_columns(one_hot_sources), matrix.T))
         
-        elif country == 'United States':
-            if 1964 <= year <= 1973:
-                events.update({'events': 'Vietnam War', 'impact': -0.1, 'conflict': 0.7})
-            elif year == 2008:
-                events.update({'events': 'Financial Crisis', 'impact': -0.2, 'crisis': 0.9})
-            elif year == 2020:
-                events.update({'events': 'COVID-19 Pandemic', 'impact': -0.15, 'disease': 0.8})
+        return columns
+
+    def one_hot_columns(self, sources: Optional[List[str]] = None) -> List[str]:
+        """Dummy column names, in one-hot matrix order"""
+        sources = list(self.one_hot_categories) if sources is None else sources
+        return [f'{col}_{category}' for col in sources for category in self.one_hot_categories[col]]
+
+    def one_hot_codes(self, frame, sources: Optional[List[str]] = None) -> np.ndarray:
+        """(rows, sources) matrix column of each row's dummy, -1 for the dropped first category or unseen values"""
+        sources = list(self.one_hot_categories) if sources is None else sources
+        codes = np.empty((len(frame), len(sources)), dtype=np.int32)
+        offset = 0
+        for j, col in enumerate(sources):
+            categories = self.one_hot_categories[col]
+            local = pd.Categorical(np.asarray(frame[col], dtype=object), categories=categories).codes
+            codes[:, j] = np.where(local >= 0, local + offset, -1)
+            offset += len(categories)
+        return codes
+
+    def one_hot_matrix(self, frame, sources: Optional[List[str]] = None, sparse: bool = True,
+                       codes: Optional[np.ndarray] = None) -> Any:
+        """All dummies in one CSR matrix (``sparse``) or uint8 array, from ``one_hot_codes``"""
+        sources = list(self.one_hot_categories) if sources is None else sources
+        codes = self.one_hot_codes(frame, sources) if codes is None else codes
+        n_columns = sum(len(self.one_hot_categories[col]) for col in sources)
+        present = codes >= 0
+        if sparse:
+            from scipy import sparse as sp
+            
+            # Row-major codes are already sorted by row and, within a row, by column
+            indptr = np.r_[0, np.cumsum(present.sum(axis=1))]
+            indices = codes[present]
+            data = np.ones(len(indices), dtype=np.uint8)
+            return sp.csr_matrix((data, indices, indptr), shape=(len(codes), n_columns))
+        matrix = np.zeros((len(codes), n_columns), dtype=np.uint8)
+        rows, _ = np.nonzero(present)
+        matrix[rows, codes[present]] = 1
+        return matrix
+
+    @staticmethod
+    def _lookup(keys: pd.Series, mapping: Dict[str, float]) -> np.ndarray:
+        """Map keys through a dict (NaN when unseen), via category codes when possible"""
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            table = np.array([mapping.get(c, np.nan) for c in keys.cat.categories], dtype=float)
+            codes = keys.cat.codes.to_numpy()
+            return np.where(codes >= 0, table[codes], np.nan)
+        return keys.map(mapping).to_numpy(dtype=float)
+
+    def fingerprint(self) -> str:
+        """Digest of the fitted statistics, stable across pickling round trips"""
+        digest = hashlib.sha256()
+        for name, value in sorted(vars(self).items()):
+            digest.update(name.encode('utf-8'))
+            digest.update(pickle.dumps(value, protocol=4))
+        return digest.hexdigest()
+
+    def save(self, path: Union[str, Path] = 'models/preprocessor.pkl') -> Path:
+        """Persist the fitted statistics"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+        logger.info(f"Saved preprocessor statistics to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = 'models/preprocessor.pkl') -> 'FittedPreprocessor':
+        """Load statistics saved with ``save``"""
+        with open(path, 'rb') as f:
+            preprocessor = pickle.load(f)
+        logger.info(f"Loaded preprocessor statistics from {path}")
+        return preprocessor
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """Columns produced by one pipeline stage (for one key) and the columns they read"""
+    stage: str
+    key: Optional[str]
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...] = ()
+    prefixes: Tuple[str, ...] = ()  # Output families named after data values (one-hot categories)
+
+
+class FeatureRegistry:
+    """Declared derived columns and the stages that produce them
+
+    Every column maps to a ``FeatureSpec``: its stage, the key restricting
+    that stage (None when the stage is computed whole) and its inputs.
+    ``resolve`` walks the inputs of the requested columns down to base
+    columns, and ``compute`` runs only the stages in that closure,
+    restricted to the needed keys and in pipeline order. Computed columns
+    are memoized per source frame, so later requests only add what is
+    missing; only a weak reference to the source frame is held. The memo
+    is dropped when the frame's rows, columns or column arrays change, or
+    when the ``state`` the stages depend on (fitted statistics) does.
+    """
+
+    def __init__(self):
+        self.specs: List[FeatureSpec] = []
+        self._by_output: Dict[str, FeatureSpec] = {}
+        self._suffix_stages: Dict[str, str] = {}
+        self._memo: Dict[int, Tuple[weakref.ref, Tuple[Any, ...], FeatureFrame, set]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The memo holds weak references and per-process frames
+        return {**self.__dict__, '_memo': {}}
+
+    def register(self, stage: str, key: Optional[str] = None, inputs=(), outputs=(),
+                 prefixes=()) -> 'FeatureRegistry':
+        spec = FeatureSpec(stage, key, tuple(inputs), tuple(outputs), tuple(prefixes))
+        self.specs.append(spec)
+        self._by_output.update({col: spec for col in spec.outputs})
+        return self
+
+    def register_suffix(self, stage: str, suffix: str) -> 'FeatureRegistry':
+        """Columns ``{col}{suffix}`` computed from ``col`` by a stage keyed by column"""
+        self._suffix_stages[suffix] = stage
+        return self
+
+    def producer(self, col: str) -> Optional[FeatureSpec]:
+        """Spec producing a column (exact names, then suffix rules, then prefix families)"""
+        if col in self._by_output:
+            return self._by_output[col]
+        for suffix, stage in self._suffix_stages.items():
+            if col.endswith(suffix):
+                stem = col[:-len(suffix)]
+                return FeatureSpec(stage, stem, (stem,), (col,))
+        for spec in self.specs:
+            if any(col.startswith(prefix) for prefix in spec.prefixes):
+                return spec
+        return None
+
+    def resolve(self, columns: List[str], available) -> Dict[str, Optional[set]]:
+        """Stages needed for ``columns`` with their keys (None for a whole stage)"""
+        needed: Dict[str, Optional[set]] = {}
+        stack, seen = list(columns), set()
+        while stack:
+            col = stack.pop()
+            if col in seen or col in available:
+                continue
+            seen.add(col)
+            spec = self.producer(col)
+            if spec is None:
+                raise KeyError(f"No registered feature produces column '{col}'")
+            if spec.key is None:
+                needed[spec.stage] = None
+            elif needed.get(spec.stage, set()) is not None:
+                needed.setdefault(spec.stage, set()).add(spec.key)
+            stack.extend(spec.inputs)
+        return needed
+
+    def compute(self, df: pd.DataFrame, columns: List[str], stages: List[Tuple[str, Callable]],
+                required: Tuple[str, ...] = (), state: Callable[[], Any] = lambda: None) -> pd.DataFrame:
+        """Requested columns of ``df`` (sorted by country and year), computing only their closure
+        
+        ``stages`` are the pipeline stages in order, keyed stages taking a
+        ``keys`` argument; ``required`` stages run whole for any request.
+        ``state()`` identifies what else the stages read (it is taken again
+        after computing, since stages may fit statistics).
+        """
+        frame, done = self._frame(df, state())
+        needed = dict.fromkeys(required)
+        needed.update(self.resolve(columns, set(frame.base.columns) | set(frame.added)))
+        for name, stage in stages:
+            if name not in needed:
+                continue
+            if needed[name] is None:
+                if (name, None) in done:
+                    continue
+                frame.add(stage(frame))
+                done.add((name, None))
+            else:
+                keys = {key for key in needed[name] if (name, key) not in done}
+                if keys:
+                    frame.add(stage(frame, keys=keys))
+                    done.update((name, key) for key in keys)
+        
+        ref, signature, _, _ = self._memo[id(df)]
+        self._memo[id(df)] = (ref, signature[:-1] + (state(),), frame, done)
+        
+        missing = [col for col in columns if col not in frame]
+        if missing:
+            raise KeyError(f"Columns not produced for this frame: {missing}")
+        return pd.DataFrame({col: frame[col] for col in columns}, index=frame.index)
+
+    def _frame(self, df: pd.DataFrame, state: Any) -> Tuple[FeatureFrame, set]:
+        """Memoized feature frame of a source frame, rebuilt if its rows, columns or state have changed"""
+        entry = self._memo.get(id(df))
+        if entry is not None:
+            ref, (length, row_index, names, arrays, memo_state), frame, done = entry
+            if (ref() is df and len(df) == length and df.index is row_index and
+                    list(df.columns) == names and memo_state == state and
+                    same_arrays(arrays, column_arrays(df, names))):
+                return frame, done
+        else:
+            weakref.finalize(df, self._memo.pop, id(df), None)
         
-        elif country == 'Japan':
-            if year == 2011:
-                events.update({'events': 'Tsunami and Fukushima', 'impact': -0.25, 'disaster': 0.9})
+        # A shallow copy, so the memo does not keep the source frame alive
+        frame, done, names = FeatureFrame(FeatureFrame.sort_panel(df.copy(deep=False))), set(), list(df.columns)
+        self._memo[id(df)] = (weakref.ref(df), (len(df), df.index, names, column_arrays(df, names), state), frame, done)
+        return frame, done
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint() -> str:
+    """SHA-256 of this module's source, so cached results expire whenever the code changes"""
+    try:
+        source = inspect.getsource(sys.modules[__name__])
+    except (OSError, TypeError):
+        source = ''
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class ProcessedDataCache:
+    """Content-addressed on-disk cache of processed frames (requires pyarrow)
+
+    Entries are keyed by a SHA-256 over the contents of the input frames,
+    the call parameters and ``source_fingerprint``; each entry is a
+    directory of Feather (Arrow IPC) files, which keep the index and
+    dtypes and write far faster than Parquet, plus an optional pickled
+    state (such as the fitted preprocessor). Hits refresh the entry's modification time
+    and every store evicts least recently used entries beyond ``max_bytes``.
+    States are unpickled on a hit, so the directory must be trusted.
+    """
+
+    def __init__(self, directory: Union[str, Path] = 'cache/processed', max_bytes: int = 2 * 1024 ** 3):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("ProcessedDataCache requires pyarrow; install it or leave caching disabled") from e
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def frame_digest(df: pd.DataFrame) -> bytes:
+        """Digest of a frame's values, index, column names and dtypes"""
+        digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+        return digest.digest()
+
+    def key(self, *frames: pd.DataFrame, **params: Any) -> str:
+        """Cache key for input frames and call parameters (pickled) under the current code"""
+        digest = hashlib.sha256(source_fingerprint().encode('utf-8'))
+        for df in frames:
+            digest.update(self.frame_digest(df))
+        for name in sorted(params):
+            digest.update(name.encode('utf-8'))
+            digest.update(pickle.dumps(params[name], protocol=4))
+        return digest.hexdigest()
+
+    def load(self, key: str, label: str = 'entry') -> Optional[Tuple[Dict[str, pd.DataFrame], Any]]:
+        """Frames and state stored under ``key``, or None on a miss"""
+        entry = self.directory / key
+        if not entry.is_dir():
+            self.misses += 1
+            logger.info(f"Cache miss for {label} ({key[:12]})")
+            return None
         
-        return events
+        import pyarrow.feather as feather
+        
+        frames = {path.stem: feather.read_table(path).to_pandas() for path in sorted(entry.glob('*.feather'))}
+        state = None
+        if (entry / 'state.pkl').exists():
+            with open(entry / 'state.pkl', 'rb') as f:
+                state = pickle.load(f)
+        os.utime(entry)
+        self.hits += 1
+        logger.info(f"Cache hit for {label} ({key[:12]})")
+        return frames, state
 
+    def store(self, key: str, frames: Dict[str, pd.DataFrame], state: Any = None) -> None:
+        """Write an entry (atomically, via a temporary directory) and evict older ones down to ``max_bytes``"""
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        
+        staging = self.directory / f'.{key}.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for name, df in frames.items():
+            feather.write_feather(pa.Table.from_pandas(df), staging / f'{name}.feather')
+        if state is not None:
+            with open(staging / 'state.pkl', 'wb') as f:
+                pickle.dump(state, f)
+        
+        entry = self.directory / key
+        shutil.rmtree(entry, ignore_errors=True)
+        staging.rename(entry)
+        self._evict(keep=key)
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries (other than ``keep``) until the cache fits ``max_bytes``"""
+        entries = [(entry.stat().st_mtime, sum(f.stat().st_size for f in entry.iterdir()), entry)
+                   for entry in self.directory.iterdir() if entry.is_dir() and not entry.name.startswith('.')]
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logger.info(f"Evicted cache entry {entry.name[:12]} ({size / 1e6:.1f} MB)")
+
+
+class ParquetColumns:
+    """Blocks of columns read across the files of a Parquet dataset (requires pyarrow)
+
+    Offers the ``values``/``select_dtypes`` part of the ``FeatureFrame``
+    interface, so column statistics (``FittedPreprocessor.fit_scaling``)
+    can be fitted over a dataset too large to load, one block at a time.
+    """
+
+    def __init__(self, paths: List[Path]):
+        import pyarrow.dataset as ds
+        self.dataset = ds.dataset([str(path) for path in paths], format='parquet')
+        self.n_rows = self.dataset.count_rows()
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def columns(self) -> List[str]:
+        return self.dataset.schema.names
+
+    def values(self, cols: List[str]) -> np.ndarray:
+        """Float (rows, columns) array of several columns"""
+        table = self.dataset.to_table(columns=list(cols))
+        block = np.empty((self.n_rows, len(cols)))
+        for j, col in enumerate(cols):
+            block[:, j] = table.column(col).to_numpy()
+        return block
+
+    def select_dtypes(self, include=None, exclude=None) -> List[str]:
+        """Column names matching ``DataFrame.select_dtypes`` over the dataset schema"""
+        empty = self.dataset.schema.empty_table().to_pandas()
+        return list(empty.select_dtypes(include=include, exclude=exclude).columns)
+
+
+@dataclass
+class StagedPanel:
+    """A panel file staged as sorted Parquet runs, read back a few whole countries at a time (requires pyarrow)
+
+    ``stage`` streams a CSV or Parquet source in chunks and writes each
+    chunk sorted by country and year as one run, so the whole panel is
+    never in memory. It keeps what the whole file would have given: the
+    countries in ``FeatureFrame.sort_panel`` order with their row counts,
+    the column dtypes and the columns with any missing value.
+    """
+
+    runs: List[Path]
+    countries: np.ndarray
+    lengths: np.ndarray
+    dtypes: Dict[str, Any]
+    gap_columns: List[str]
+
+    SAMPLE_ROWS = 1000
+    ROW_GROUP_ROWS = 8192  # Small enough for country filters to skip most of a run
+
+    @staticmethod
+    def chunks(source: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """The rows of a CSV or Parquet file, ``chunk_rows`` at a time"""
+        if source.suffix in ('.parquet', '.pq'):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        else:
+            with pd.read_csv(source, chunksize=chunk_rows) as reader:
+                yield from reader
+
+    @classmethod
+    def row_bytes(cls, source: Path) -> float:
+        """In-memory bytes per row, from the first rows of the file"""
+        sample = next(cls.chunks(source, cls.SAMPLE_ROWS))
+        return sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+
+    @classmethod
+    def stage(cls, source: Path, directory: Path, chunk_rows: int) -> 'StagedPanel':
+        """Write ``source`` to ``directory`` as runs of ``chunk_rows`` sorted rows"""
+        directory.mkdir(parents=True, exist_ok=True)
+        runs, counts, dtypes, gaps = [], Counter(), {}, set()
+        for chunk in cls.chunks(source, chunk_rows):
+            for col, dtype in chunk.dtypes.items():
+                dtypes[col] = cls._common_dtype(dtypes.get(col, dtype), dtype)
+            gaps.update(chunk.columns[chunk.isna().any().to_numpy()])
+            counts.update(chunk.groupby('country', observed=True, sort=False).size().to_dict())
+            runs.append(directory / f'run-{len(runs):05d}.parquet')
+            FeatureFrame.sort_panel(chunk).to_parquet(runs[-1], index=False, row_group_size=cls.ROW_GROUP_ROWS)
+
+        # Countries in the order sorting the whole panel would give
+        countries = np.array(list(counts), dtype=object)
+        if isinstance(dtypes['country'], pd.CategoricalDtype):
+            order = np.argsort(pd.Categorical(countries, dtype=dtypes['country']).codes, kind='stable')
+        else:
+            order = np.argsort(countries, kind='stable')
+        countries = countries[order]
+        return cls(runs=runs, countries=countries, lengths=np.array([counts[country] for country in countries]),
+                   dtypes=dtypes, gap_columns=[col for col in dtypes if col in gaps])
+
+    @staticmethod
+    def _common_dtype(first: Any, second: Any) -> Any:
+        """Dtype the whole column loads with, given the dtypes of two of its chunks"""
+        if first == second:
+            return first
+        if isinstance(first, pd.CategoricalDtype) and isinstance(second, pd.CategoricalDtype):
+            return pd.CategoricalDtype(first.categories.union(second.categories, sort=False), first.ordered)
+        if isinstance(first, np.dtype) and isinstance(second, np.dtype):
+            return np.result_type(first, second)
+        return np.dtype(object)
+
+    def stop(self, position: int, max_rows: int) -> int:
+        """End of the countries from ``position`` that fit in ``max_rows`` rows (at least one)"""
+        rows = np.cumsum(self.lengths[position:])
+        return position + max(1, int(np.searchsorted(rows, max_rows, side='right')))
+
+    def read(self, countries: np.ndarray) -> pd.DataFrame:
+        """Rows of some countries from every run, sorted by country and year"""
+        filters = [('country', 'in', list(countries))]
+        frames = [frame for run in self.runs if len(frame := pd.read_parquet(run, filters=filters))]
+        frame = pd.concat(frames, ignore_index=True).astype(self.dtypes)
+        return FeatureFrame.sort_panel(frame).reset_index(drop=True)
+
+    def partitions(self, max_rows: int) -> Iterator[pd.DataFrame]:
+        """Consecutive frames of whole countries of up to ``max_rows`` rows"""
+        position = 0
+        while position < len(self.countries):
+            stop = self.stop(position, max_rows)
+            yield self.read(self.countries[position:stop])
+            position = stop
+
+
+class PartitionStatistics(FittedPreprocessor):
+    """Frame-wide statistics merged over partitions of whole countries
+
+    Stands in for the processor's preprocessor while the partitions of a
+    panel too large to load run through the stages with ``fit=True``.
+    Each partition is processed with its own statistics, while maxima,
+    modes, medians (over the values kept for each, one float per row) and
+    the encoding vocabularies are merged to what the whole frame gives.
+    Country means are exact because no country spans two partitions.
+    Statistics in ``fixed`` are returned as they are.
+    """
+
+    def __init__(self, sparse_one_hot: bool = False, fixed: Optional[Dict[str, Any]] = None):
+        super().__init__(sparse_one_hot)
+        self.fixed = dict(fixed or {})
+        self.samples: Dict[str, List[np.ndarray]] = defaultdict(list)
+        self.maxima: Dict[str, float] = {}
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        self.merged_country_means: Dict[str, float] = {}
+        self.merged_region_codes: Dict[str, int] = {}
+        self.vocabularies: Dict[str, Optional[set]] = {}
+
+    def statistic(self, name: str, values: pd.Series, reduce: str, fit: bool) -> Any:
+        if name in self.fixed:
+            return self.fixed[name]
+        if fit:
+            self.observe(name, values, reduce)
+        return super().statistic(name, values, reduce, fit)
+
+    def observe(self, name: str, values: pd.Series, reduce: str) -> None:
+        """Merge one partition's ``values`` into the statistic"""
+        if reduce == 'median':
+            self.samples[name].append(values.dropna().to_numpy(dtype=np.float64))
+        elif reduce == 'max':
+            self.maxima[name] = np.fmax(self.maxima.get(name, np.nan), values.max())
+        elif reduce == 'mode':
+            self.counts[name].update(values.value_counts().to_dict())
+
+    def fit_encoding(self, frame: FeatureFrame) -> None:
+        super().fit_encoding(frame)
+        if 'country' in frame:
+            self.merged_country_means.update(self.country_means)
+        for region in self.region_codes:
+            self.merged_region_codes.setdefault(region, len(self.merged_region_codes))
+        for col in frame.select_dtypes(include=['object']):
+            if col in ['country', 'region']:
+                continue
+            vocabulary = self.vocabularies.setdefault(col, set())
+            if vocabulary is not None:
+                vocabulary.update(frame[col].dropna().unique())
+                if len(vocabulary) > self.MAX_ONE_HOT_CATEGORIES:
+                    self.vocabularies[col] = None
+
+    def merged(self) -> Dict[str, Any]:
+        """Every statistic as the whole frame gives it"""
+        statistics = dict(self.maxima)
+        for name, samples in self.samples.items():
+            values = np.concatenate(samples)
+            statistics[name] = float(np.median(values)) if len(values) else np.nan
+        for name, counts in self.counts.items():
+            top = max(counts.values(), default=0)
+            statistics[name] = min((value for value, count in counts.items() if count == top), default='Unknown')
+        statistics.update(self.fixed)
+        return statistics
+
+    def apply_to(self, preprocessor: FittedPreprocessor) -> None:
+        """Record the merged statistics and encodings in ``preprocessor``"""
+        preprocessor.statistics.update(self.merged())
+        if self.fitted_encoding:
+            if self.merged_country_means:
+                preprocessor.country_means = dict(self.merged_country_means)
+            if self.merged_region_codes:
+                preprocessor.region_codes = dict(self.merged_region_codes)
+            preprocessor.one_hot_categories = {col: sorted(vocabulary)[1:] for col, vocabulary in self.vocabularies.items()
+                                               if vocabulary is not None}
+            preprocessor.fitted_encoding = True
 
-# ============================================================================
-# DATA PROCESSING AND FEATURE ENGINEERING MODULE
-# ============================================================================
 
 class PopulationDataProcessor:
     """Advanced data processing and feature engineering for population data"""
     
-    def __init__(self):
+    # Source columns of the keyed stages
+    LAG_COLUMNS = ['population', 'birth_rate', 'death_rate', 'gdp_per_capita',
+                   'urbanization_rate', 'life_expectancy', 'fertility_rate']
+    ROLLING_COLUMNS = ['population', 'birth_rate', 'death_rate', 'gdp_growth',
+                       'urbanization_rate', 'life_expectancy']
+    POLYNOMIAL_VARIABLES = ['gdp_per_capita', 'life_expectancy', 'urbanization_rate',
+                            'education_index', 'fertility_rate']
+    
+    # Periods the time-series features look back and the targets look ahead
+    LAG_PERIODS = [1, 2, 3, 4, 5]
+    DIFF_PERIODS = [1, 5]
+    ROLLING_MEAN_WINDOWS = [3, 5, 10]
+    ROLLING_STD_WINDOWS = [5, 10]
+    EMA_SPANS = [3, 5]
+    TARGET_HORIZON = 20
+    EMA_TOLERANCE = 1e-9  # Weight of EMA history dropped by incremental updates
+    OUT_OF_CORE_PEAK_FACTOR = 3  # Working memory of a partition relative to its processed size
+    PLACEHOLDER_ORIGIN_YEAR = 1800  # Placeholder draws are indexed by years since this one
+    
+    def __init__(self, sparse_one_hot: bool = False, seed: int = 42):
+        self.seed = seed
         self.scaler = StandardScaler()
         self.encoders = {}
         self.feature_columns = []
         self.target_columns = []
-        
-    def preprocess_world_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Preprocess world population data with feature engineering"""
+        self.pipeline_report = []
+        self.preprocessor = FittedPreprocessor(sparse_one_hot)
+        self.feature_registry = self._build_feature_registry()
+        self.cache: Optional[ProcessedDataCache] = None
+        
+    def preprocess_world_data(self, df: pd.DataFrame, track_memory: bool = False,
+                              fit: bool = True, compact: bool = False) -> pd.DataFrame:
+        """Preprocess world population data with feature engineering
+        
+        The input is never modified or copied per stage: every stage reads
+        the sorted panel and returns only its new columns, and the output
+        is materialized once at the end. Per-stage timings (and traced peak
+        memory with ``track_memory``) are kept in ``pipeline_report``.
+        
+        With ``fit=True`` the scaling and encoding statistics are fitted on
+        ``df`` and kept in ``self.preprocessor``; with ``fit=False`` the
+        stored (or loaded) statistics are applied without recomputing them.
+        
+        ``compact=True`` emits float32 features, the narrowest integer
+        codes, categoricals for string columns and bool dummies, and logs
+        the memory before and after.
+        """
         logger.info("Preprocessing world population data")
-        
-        # Create a copy to avoid modifying original
-        processed_df = df.copy()
-        
-        # 1. Handle missing values
-        processed_df = self._handle_missing_values(processed_df)
-        
-        # 2. Feature engineering - temporal features
-        processed_df = self._create_temporal_features(processed_df)
-        
-        # 3. Feature engineering - demographic indicators
-        processed_df = self._create_demographic_features(processed_df)
-        
-        # 4. Feature engineering - economic indicators
-        processed_df = self._create_economic_features(processed_df)
-        
-        # 5. Feature engineering - social indicators
-        processed_df = self._create_social_features(processed_df)
-        
-        # 6. Feature engineering - environmental indicators
-        processed_df = self._create_environmental_features(processed_df)
-        
-        # 7. Create lag features for time series
-        processed_df = self._create_lag_features(processed_df)
-        
-        # 8. Create rolling statistics
-        processed_df = self._create_rolling_features(processed_df)
-        
-        # 9. Create interaction terms
-        processed_df = self._create_interaction_features(processed_df)
-        
-        # 10. Create polynomial features for key variables
-        processed_df = self._create_polynomial_features(processed_df)
-        
-        # 11. Normalize numerical features
-        processed_df = self._normalize_features(processed_df)
-        
-        # 12. Encode categorical variables
-        processed_df = self._encode_categorical_features(processed_df)
-        
-        # 13. Create target variables for prediction
-        processed_df = self._create_target_variables(processed_df)
+        if not fit and not self.preprocessor.is_fitted:
+            raise ValueError("Preprocessor statistics are not fitted; run with fit=True or load_preprocessor()")
+        
+        # Cached result (and the preprocessor state it leaves behind) for identical inputs
+        if self.cache is not None:
+            # A fit depends only on df; applying depends on the stored statistics too
+            key = self.cache.key(df, fit=fit, compact=compact, seed=self.seed,
+                                 sparse_one_hot=self.preprocessor.sparse_one_hot,
+                                 preprocessor=None if fit else self.preprocessor.fingerprint())
+            cached = self.cache.load(key, 'preprocess_world_data')
+            if cached is not None:
+                frames, (self.preprocessor, self.pipeline_report) = cached
+                return frames['processed']
+        
+        pipeline = self.build_pipeline(track_memory=track_memory, fit=fit)
+        processed_df = pipeline.run(df, compact=compact)
+        self.pipeline_report = pipeline.report
+        
+        if compact:
+            memory = self.pipeline_report[-1]
+            logger.info(f"Compact dtypes: {memory['memory_before_mb']:.1f} MB -> {memory['memory_after_mb']:.1f} MB")
+        if self.cache is not None:
+            self.cache.store(key, {'processed': processed_df}, (self.preprocessor, self.pipeline_report))
         
         logger.info(f"Preprocessing complete. Original shape: {df.shape}, Processed shape: {processed_df.shape}")
         return processed_df
     
-    def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Handle missing values in the dataset"""
-        # For time series, forward fill then backward fill
-        df = df.sort_values(['country', 'year'])
-        
-        # Group by country and fill missing values
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        categorical_cols = df.select_dtypes(exclude=[np.number]).columns
+    def preprocess_world_data_sharded(self, df: pd.DataFrame, n_workers: Optional[int] = None,
+                                      fit: bool = True) -> pd.DataFrame:
+        """``preprocess_world_data`` over country shards in a process pool
+        
+        Pass one fits the frame-wide statistics (fill medians, footprint
+        maximum, growth median, target-encoding means and vocabularies) from
+        the few columns they need. Pass two runs every per-country stage on
+        contiguous country shards in parallel and stitches them in panel
+        order. The scaling quantiles cover nearly every derived column, so
+        when fitting they are computed on the stitched frame instead.
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        if fit:
+            self._fit_frame_statistics(df)
+        elif not self.preprocessor.is_fitted:
+            raise ValueError("Preprocessor statistics are not fitted; run with fit=True or load_preprocessor()")
+        
+        # Contiguous shards of whole countries
+        df = FeatureFrame.sort_panel(df)
+        segments = PanelSegments.from_frame(df)
+        bounds = [(segments.starts[ids[0]], segments.starts[ids[-1]] + segments.lengths[ids[-1]])
+                  for ids in np.array_split(np.arange(len(segments.starts)), n_workers) if len(ids)]
+        shards = [df.iloc[start:stop] for start, stop in bounds]
+        stages = [name for name, _ in self._stages(fit=False) if not (fit and name == 'normalize')]
+        logger.info(f"Preprocessing world population data in {len(shards)} country shards")
+        
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            frames = list(pool.map(self._preprocess_shard, shards, itertools.repeat(stages)))
+        processed = pd.concat(frames)
+        
+        if fit:
+            processed = self._scale_stitched(processed)
+        
+        logger.info(f"Preprocessing complete. Original shape: {df.shape}, Processed shape: {processed.shape}")
+        return processed
+    
+    def _fit_frame_statistics(self, df: pd.DataFrame) -> None:
+        """Fit the frame-wide statistics used by the per-country stages (all but scaling)"""
+        # Through a shallow copy, so the memoized columns are released straight away
+        self.compute_features(df.copy(deep=False), [
+            'environmental_sustainability', 'high_growth', 'country_encoded',
+            'region_encoded', 'development_stage_encoded'], fit=True)
+    
+    def _preprocess_shard(self, shard: pd.DataFrame, stages: List[str]) -> pd.DataFrame:
+        """Named stages over one country shard with the fitted statistics"""
+        return self.build_pipeline(stages, track_memory=False, fit=False).run(shard)
+    
+    def _scale_stitched(self, processed: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
+        """Add the scaled columns (fitting them first), placed where the normalize stage puts them"""
+        after = self._after_normalize(processed.columns)
+        before = [col for col in processed.columns if col not in set(after)]
+        
+        frame = FeatureFrame(processed[before])
+        frame.add(self._normalize_features(frame, fit=fit, keys=set(before)))
+        return pd.concat([frame.materialize(), processed[after]], axis=1)
+    
+    def _after_normalize(self, columns: List[str]) -> List[str]:
+        """Columns produced by the stages that run after normalization"""
+        later = {'encode', 'targets'}
+        return [col for col in columns
+                if (spec := self.feature_registry.producer(col)) is not None and spec.stage in later]
+    
+    def preprocess_world_data_out_of_core(self, source: Union[str, Path], destination: Union[str, Path],
+                                          memory_limit_mb: float = 1024, fit: bool = True) -> Path:
+        """``preprocess_world_data`` streamed from a CSV/Parquet file into a Parquet dataset (requires pyarrow)
+        
+        Pass one streams the source in chunks sized to ``memory_limit_mb``
+        and stages each one sorted by country as a Parquet run
+        (``StagedPanel``). When fitting, the frame-wide statistics of the
+        sharded path are then merged over partitions of whole countries
+        (``_fit_partition_statistics``). Whole-country partitions are read
+        back, processed and written one at a time as ``part-NNNNN.parquet``;
+        the first partition is a single country, whose processed size sets
+        how many rows later partitions hold to stay within the limit.
+        When fitting, the scaling quantiles are computed from the written
+        partitions a block of columns at a time and a last pass adds the
+        scaled columns. Returns the dataset directory (``pd.read_parquet``
+        loads it as the serial pipeline's output with a fresh index).
+        """
+        if not fit and not self.preprocessor.is_fitted:
+            raise ValueError("Preprocessor statistics are not fitted; run with fit=True or load_preprocessor()")
+        source, destination = Path(source), Path(destination)
+        limit = memory_limit_mb * 1024 ** 2
+        destination.mkdir(parents=True, exist_ok=True)
+        for stale in destination.glob('part-*.parquet'):
+            stale.unlink()
+        staging = destination / '_staging'
+        staging.mkdir(exist_ok=True)
         
-        # For numeric columns, interpolate within each country
-        for col in numeric_cols:
-            df[col] = df.groupby('country')[col].transform(
-                lambda x: x.interpolate(method='linear', limit_direction='both')
-            )
+        try:
+            # Pass one: the raw panel staged in sorted runs, then the frame-wide statistics over it
+            chunk_rows = max(1, int(limit / (StagedPanel.row_bytes(source) * self.OUT_OF_CORE_PEAK_FACTOR)))
+            panel = StagedPanel.stage(source, staging / 'raw', chunk_rows)
+            logger.info(f"Staged {panel.lengths.sum()} raw rows of {len(panel.countries)} countries "
+                        f"in {len(panel.runs)} runs; streaming partitions")
+            if fit:
+                self._fit_partition_statistics(panel, chunk_rows, staging)
+            
+            # Pass two: country partitions through every per-country stage
+            stages = [name for name, _ in self._stages(fit=False) if not (fit and name == 'normalize')]
+            parts, position, partition_rows = [], 0, None
+            while position < len(panel.countries):
+                stop = position + 1
+                if partition_rows is not None:
+                    stop = panel.stop(position, partition_rows)
+                    if panel.lengths[position] > partition_rows:
+                        logger.warning(f"Country {panel.countries[position]} alone exceeds the {memory_limit_mb} MB partition budget")
+                
+                processed = self._preprocess_shard(panel.read(panel.countries[position:stop]), stages)
+                if partition_rows is None:
+                    row_bytes = processed.memory_usage(deep=True).sum() / max(len(processed), 1)
+                    partition_rows = max(1, int(limit / (row_bytes * self.OUT_OF_CORE_PEAK_FACTOR)))
+                
+                path = (staging if fit else destination) / f'part-{len(parts):05d}.parquet'
+                processed.to_parquet(path, index=False)
+                parts.append(path)
+                position = stop
+            logger.info(f"Wrote {len(parts)} partitions of up to {partition_rows} rows")
+            
+            # Pass three: scaling fitted over the dataset in column blocks, then applied per partition
+            if fit:
+                columns = ParquetColumns(parts)
+                block_columns = max(1, min(FeatureFrame.BLOCK_COLUMNS,
+                                           int(limit / (len(columns) * 8 * self.OUT_OF_CORE_PEAK_FACTOR))))
+                after = set(self._after_normalize(columns.columns))
+                self._fit_normalization(columns, {col for col in columns.columns if col not in after}, block_columns)
+                for path in parts:
+                    self._scale_stitched(pd.read_parquet(path), fit=False).to_parquet(destination / path.name, index=False)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        
+        logger.info(f"Out-of-core preprocessing complete: {len(parts)} partitions in {destination}")
+        return destination
+    
+    def _fit_partition_statistics(self, panel: StagedPanel, partition_rows: int, staging: Path) -> None:
+        """``_fit_frame_statistics`` over partitions of a staged panel, merged to the whole panel's values
+        
+        The fill statistics come first, since every other statistic is
+        computed after filling: modes are counted over the columns with
+        gaps, and fill medians are taken one column at a time from the
+        interpolated columns spilled to Parquet. With those fixed, a second
+        scan merges the remaining statistics and the encodings.
+        """
+        fills = PartitionStatistics(self.preprocessor.sparse_one_hot)
+        needed, spills = set(), []
+        for partition in panel.partitions(partition_rows):
+            frame = FeatureFrame(partition)
+            columns = self._interpolate_gaps(frame)
+            interpolated = {}
+            for col in panel.gap_columns:
+                values = columns.get(col, frame[col])
+                reduce = self._fill_reduction(values)
+                if reduce is not None and values.isna().any():
+                    needed.add(f'{reduce}:{col}')
+                if reduce == 'median':
+                    interpolated[col] = values.to_numpy(dtype=np.float64)
+                elif reduce == 'mode':
+                    fills.observe(f'mode:{col}', values, 'mode')
+            if interpolated:
+                spills.append(staging / f'gaps-{len(spills):05d}.parquet')
+                pd.DataFrame(interpolated).to_parquet(spills[-1], index=False)
+        
+        fixed = {name: value for name, value in fills.merged().items() if name in needed}
+        gaps = ParquetColumns(spills) if spills else None
+        for name in needed:
+            reduce, col = name.split(':', 1)
+            if reduce == 'median':
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN columns
+                    fixed[name] = float(np.nanmedian(gaps.values([col])))
+        
+        merged = PartitionStatistics(self.preprocessor.sparse_one_hot, fixed)
+        preprocessor, self.preprocessor = self.preprocessor, merged
+        try:
+            for partition in panel.partitions(partition_rows):
+                self._fit_frame_statistics(partition)
+        finally:
+            self.preprocessor = preprocessor
+        merged.apply_to(self.preprocessor)
+    
+    def feature_lookback(self, tolerance: float = EMA_TOLERANCE) -> int:
+        """Trailing periods a row's features depend on (EMAs truncated below ``tolerance``)"""
+        # EMA weights decay by (1 - alpha) per period, so older periods weigh less than the tolerance
+        alpha = 2 / (max(self.EMA_SPANS) + 1)
+        ema_depth = int(np.ceil(np.log(tolerance) / np.log(1 - alpha)))
+        
+        # A window of w rows reaches back w - 1 periods, one more over gdp_growth (a one-period difference)
+        return max(max(self.LAG_PERIODS + self.DIFF_PERIODS),
+                   max(self.ROLLING_MEAN_WINDOWS + self.ROLLING_STD_WINDOWS),
+                   ema_depth + 1)
+    
+    def preprocess_incremental(self, processed: pd.DataFrame, new_rows: pd.DataFrame,
+                               tolerance: float = EMA_TOLERANCE,
+                               history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Extend a processed frame with newly appended periods
+        
+        Features are computed only for the new rows, with ``feature_lookback``
+        trailing rows of each country as context for the lags, rolling
+        windows and EMAs. Scaling, encoding and other frame-wide statistics
+        are the fitted ones.
+        
+        ``history`` is the raw frame ``processed`` was computed from. With
+        it, the trailing gaps of each country (filled from the last observed
+        value, or by the median when a column was never observed) are
+        interpolated again up to the new values, and those rows are
+        rewritten, so the result equals a ``fit=False`` recompute up to
+        EMA truncation at ``tolerance``. Without it, fills are forward-only:
+        processed rows keep their filled values and new rows are filled
+        from what precedes them. Either way the preceding
+        ``TARGET_HORIZON`` rows of each country get new forward targets.
+        """
+        if not self.preprocessor.is_fitted:
+            raise ValueError("Preprocessor statistics are not fitted; run preprocess_world_data or load_preprocessor() first")
+        
+        lookback = self.feature_lookback(tolerance)
+        logger.info(f"Incremental preprocessing of {len(new_rows)} new rows (lookback {lookback}, horizon {self.TARGET_HORIZON})")
+        
+        # Keep appended countries on one categorical dictionary
+        categories = {col: dtype for col, dtype in new_rows.dtypes.items()
+                      if isinstance(dtype, pd.CategoricalDtype) and processed[col].dtype != dtype}
+        if categories:
+            processed = processed.astype(categories)
+        
+        # Rows counted from the end of each country, for the countries receiving new periods
+        processed = processed.reset_index(drop=True)
+        from_end = processed.groupby('country', observed=True).cumcount(ascending=False).to_numpy()
+        affected = processed['country'].isin(new_rows['country'].unique()).to_numpy()
+        raw = processed[list(new_rows.columns)]
+        
+        # Cells of each country's trailing gaps, which later observations interpolate
+        trailing = np.zeros((len(processed), 0), dtype=bool)
+        if history is not None:
+            if len(history) != len(processed):
+                raise ValueError(f"history has {len(history)} rows, processed has {len(processed)}")
+            history = FeatureFrame.sort_panel(history).reset_index(drop=True)
+            gap_cols = [col for col in history.select_dtypes(include=[np.number]).columns
+                        if col in raw.columns and history[col].isna().any()]
+            if gap_cols:
+                observed = history[gap_cols].notna()
+                trailing = ~observed[::-1].groupby(history['country'][::-1], observed=True).cummax()[::-1].to_numpy()
+                raw = raw.mask(pd.DataFrame(trailing, columns=gap_cols).reindex(columns=raw.columns, fill_value=False))
+        rewritten_rows = pd.Series(trailing.any(axis=1)).groupby(processed['country'], observed=True).transform('sum')
+        rewritten_rows = rewritten_rows.to_numpy(dtype=np.int64) * affected
+        rewrite = affected & (from_end < rewritten_rows)
+        
+        # 1. Features of the rewritten and new rows over their trailing context
+        context = affected & (from_end < rewritten_rows + lookback)
+        combined = pd.concat([raw.loc[context], new_rows], ignore_index=True)
+        features = self.preprocess_world_data(combined, fit=False)
+        labels = features.index.to_numpy()
+        keep = (labels >= context.sum()) | np.append(rewrite[context], np.zeros(len(new_rows), dtype=bool))[labels]
+        features = features.loc[keep, list(processed.columns)]
+        
+        # 2. Forward targets of the stale rows, which now reach the rewritten and new periods
+        stale = np.flatnonzero(affected & ~rewrite & (from_end < rewritten_rows + self.TARGET_HORIZON))
+        window = FeatureFrame.sort_panel(pd.concat([processed.iloc[stale], features], ignore_index=True))
+        targets = self._create_target_variables(FeatureFrame(window), fit=False)
+        labels = window.index.to_numpy()
+        from_stale = labels < len(stale)
+        
+        # 3. Replace the rewritten rows, append the new ones in panel order and patch the stale targets
+        features.index = pd.RangeIndex(len(processed), len(processed) + len(features))
+        updated = pd.concat([processed[~rewrite], features])
+        updated = FeatureFrame.sort_panel(updated)
+        position = np.empty(len(processed) + len(features), dtype=np.int64)
+        position[updated.index.to_numpy()] = np.arange(len(updated))
+        rows = position[stale[labels[from_stale]]]
+        patched = {}
+        for col, values in targets.items():
+            column = updated[col].to_numpy(copy=True)
+            column[rows] = np.asarray(values)[from_stale]
+            patched[col] = column
+        updated = updated.reset_index(drop=True).assign(**patched)
+        
+        logger.info(f"Computed features for {len(features)} rows ({rewrite.sum()} rewritten) "
+                    f"and targets for {len(stale)} trailing rows")
+        return updated
+    
+    def build_pipeline(self, stages: Optional[List[str]] = None, track_memory: bool = True,
+                       fit: bool = True) -> FeaturePipeline:
+        """Feature pipeline with every preprocessing stage, or only the named ones (in pipeline order)"""
+        pipeline = FeaturePipeline(track_memory=track_memory)
+        for name, stage in self._stages(fit):
+            if stages is None or name in stages:
+                pipeline.add_stage(name, stage)
+        return pipeline
+    
+    def _stages(self, fit: bool) -> List[Tuple[str, Callable]]:
+        """Named preprocessing stages in pipeline order"""
+        return [
+            ('missing_values', partial(self._handle_missing_values, fit=fit)),    # 1. Handle missing values
+            ('temporal', self._create_temporal_features),           # 2. Temporal features
+            ('demographic', self._create_demographic_features),     # 3. Demographic indicators
+            ('economic', self._create_economic_features),           # 4. Economic indicators
+            ('social', self._create_social_features),               # 5. Social indicators
+            ('environmental', partial(self._create_environmental_features, fit=fit)),  # 6. Environmental indicators
+            ('lag', self._create_lag_features),                     # 7. Lag features for time series
+            ('rolling', self._create_rolling_features),             # 8. Rolling statistics
+            ('interaction', partial(self._create_interaction_features, fit=fit)),  # 9. Interaction terms
+            ('polynomial', self._create_polynomial_features),       # 10. Polynomial features
+            ('normalize', partial(self._normalize_features, fit=fit)),            # 11. Normalize numerical features
+            ('encode', partial(self._encode_categorical_features, fit=fit)),      # 12. Encode categorical variables
+            ('targets', partial(self._create_target_variables, fit=fit))          # 13. Target variables for prediction
+        ]
+    
+    def compute_features(self, df: pd.DataFrame, columns: List[str], fit: Optional[bool] = None) -> pd.DataFrame:
+        """Only the requested feature columns of a raw frame, sorted by country and year
+        
+        Stages run restricted to the dependency closure of ``columns`` (see
+        ``feature_registry``) and results are memoized per frame, so a few
+        features cost a fraction of ``preprocess_world_data``. Statistics
+        are fitted unless the preprocessor already is (or ``fit`` says so).
+        """
+        fit = not self.preprocessor.is_fitted if fit is None else fit
+        return self.feature_registry.compute(df, list(columns), self._stages(fit), required=('missing_values',),
+                                             state=self.preprocessor.fingerprint)
+    
+    def _build_feature_registry(self) -> FeatureRegistry:
+        """Declare every derived column with its producing stage and inputs"""
+        registry = FeatureRegistry()
+        
+        # Whole stages: cheap row-wise features
+        registry.register('temporal', inputs=['year'], outputs=[
+            'decade', 'half_century', 'year_sin', 'year_cos', 'years_since_1950',
+            'years_since_2000', 'economic_cycle', 'quarter'])
+        registry.register('demographic', inputs=[
+            'population', 'birth_rate', 'death_rate', 'dependency_ratio', 'sex_ratio', 'fertility_rate',
+            'life_expectancy', 'migration_rate', 'growth_rate', 'urbanization_rate'], outputs=[
+            'population_growth_pct', 'population_growth_abs', 'demographic_transition', 'youth_dependency',
+            'elderly_dependency', 'working_age_ratio', 'sex_ratio_deviation', 'male_surplus',
+            'fertility_deviation', 'below_replacement', 'premature_mortality', 'net_migration_rate',
+            'migration_impact', 'urbanization_stage', 'demographic_dividend', 'population_momentum'])
+        registry.register('economic', inputs=[
+            'gdp_total', 'gdp_per_capita', 'urbanization_rate', 'education_index', 'population',
+            'working_age_ratio'], outputs=[
+            'gdp_total_log', 'gdp_per_capita_log', 'gdp_growth', 'development_stage', 'economic_complexity',
+            'labor_productivity', 'capital_intensity', 'inequality_proxy', 'gdp_volatility',
+            'investment_rate', 'savings_rate'])
+        registry.register('social', inputs=[
+            'life_expectancy', 'education_index', 'gdp_per_capita_log', 'literacy_rate', 'unemployment_rate',
+            'healthcare_index', 'poverty_rate', 'gdp_per_capita', 'political_stability', 'happiness_index',
+            'digital_adoption', 'inequality_proxy'], outputs=[
+            'human_development_index', 'gender_inequality', 'education_gap', 'literacy_deviation',
+            'healthcare_gap', 'life_expectancy_gap', 'poverty_severity', 'social_stability',
+            'digital_divide', 'tech_readiness', 'social_mobility'])
+        registry.register('environmental', inputs=[
+            'co2_emissions', 'energy_consumption', 'population_density', 'gdp_per_capita', 'water_stress',
+            'food_security', 'population_growth_pct', 'forest_cover', 'natural_hazards',
+            'infrastructure_quality'], outputs=[
+            'ecological_footprint', 'carbon_intensity', 'water_stress_index', 'food_security_index',
+            'environmental_sustainability', 'climate_vulnerability', 'renewable_potential'])
+        registry.register('interaction', inputs=[
+            'birth_rate', 'death_rate', 'population_density', 'gdp_per_capita', 'urbanization_rate',
+            'education_index', 'life_expectancy', 'gdp_growth', 'population_growth_pct', 'fertility_rate',
+            'healthcare_index', 'ecological_footprint', 'digital_adoption', 'human_development_index',
+            'economic_complexity', 'environmental_sustainability'], outputs=[
+            'birth_death_ratio', 'pop_density_gdp', 'urban_education', 'life_exp_gdp', 'gdp_pop_growth',
+            'fertility_education', 'health_env', 'edu_tech', 'development_triangle'])
+        
+        # Keyed stages: one key per source column
+        for col in self.LAG_COLUMNS:
+            registry.register('lag', col, [col], [f'{col}_lag_{lag}' for lag in self.LAG_PERIODS] +
+                              [f'{col}_diff_{period}' for period in self.DIFF_PERIODS])
+        for col in self.ROLLING_COLUMNS:
+            registry.register('rolling', col, [col], [f'{col}_rolling_mean_{w}' for w in self.ROLLING_MEAN_WINDOWS] +
+                              [f'{col}_rolling_std_{w}' for w in self.ROLLING_STD_WINDOWS] +
+                              [f'{col}_ema_{span}' for span in self.EMA_SPANS])
+        for var in self.POLYNOMIAL_VARIABLES:
+            registry.register('polynomial', var, [var], [f'{var}_{form}' for form in ['squared', 'cubed', 'log', 'sqrt']])
+        registry.register_suffix('normalize', '_scaled')
+        
+        registry.register('encode', 'country_encoded', ['country', 'population'], ['country_encoded'])
+        registry.register('encode', 'region_encoded', ['region'], ['region_encoded'])
+        registry.register('encode', 'development_stage_encoded', ['development_stage'], ['development_stage_encoded'])
+        for col in ['demographic_transition', 'urbanization_stage', 'development_stage']:
+            registry.register('encode', col, [col], prefixes=[f'{col}_'])
+        
+        registry.register('targets', 'population_next_5', ['population'], ['population_next_5', 'pop_growth_5yr'])
+        registry.register('targets', 'birth_rate_next', ['birth_rate'], ['birth_rate_next'])
+        registry.register('targets', 'life_exp_next_10', ['life_expectancy'], ['life_exp_next_10'])
+        registry.register('targets', 'urban_next_20', ['urbanization_rate'], ['urban_next_20'])
+        registry.register('targets', 'high_growth', ['population_growth_pct'], ['high_growth'])
+        registry.register('targets', 'aging_population', ['median_age'], ['aging_population'])
+        registry.register('targets', 'urban_majority', ['urbanization_rate'], ['urban_majority'])
+        registry.register('targets', 'future_development', ['development_stage_encoded'], ['future_development'])
+        return registry
+    
+    def _handle_missing_values(self, frame: FeatureFrame, fit: bool = True) -> Dict[str, Any]:
+        """Handle missing values in the dataset"""
+        columns = self._interpolate_gaps(frame)
         
         # Fill any remaining NaNs with median/mode
-        for col in df.columns:
-            if df[col].dtype in [np.float64, np.int64]:
-                df[col].fillna(df[col].median(), inplace=True)
-            elif df[col].dtype == 'object':
-                df[col].fillna(df[col].mode()[0] if not df[col].mode().empty else 'Unknown', inplace=True)
+        for col in frame.columns:
+            values = columns.get(col, frame[col])
+            if not values.isna().any():
+                continue
+            reduce = self._fill_reduction(values)
+            if reduce is not None:
+                columns[col] = values.fillna(self.preprocessor.statistic(f'{reduce}:{col}', values, reduce, fit))
         
-        return df
+        return columns
+    
+    @staticmethod
+    def _interpolate_gaps(frame: FeatureFrame) -> Dict[str, pd.Series]:
+        """Numeric columns with gaps, interpolated within each country in one pass"""
+        numeric_cols = frame.select_dtypes(include=[np.number])
+        gap_cols = [col for col in numeric_cols if frame[col].isna().any()]
+        if not gap_cols:
+            return {}
+        interpolated = frame.segments.interpolate(frame.values(gap_cols))
+        return {col: pd.Series(values, index=frame.index) for col, values in zip(gap_cols, interpolated.T)}
+    
+    @staticmethod
+    def _fill_reduction(values: pd.Series) -> Optional[str]:
+        """Statistic filling what interpolation leaves of a column's gaps: 'median', 'mode' or None"""
+        if values.dtype in [np.float64, np.int64]:
+            return 'median'
+        if values.dtype == 'object':
+            return 'mode'
+        return None
     
-    def _create_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_temporal_features(self, frame: FeatureFrame) -> Dict[str, Any]:
         """Create temporal features from year column"""
-        df = df.copy()
+        year = frame['year']
+        columns = {}
         
         # Basic temporal features
-        df['decade'] = (df['year'] // 10) * 10
-        df['half_century'] = (df['year'] // 50) * 50
-        df['year_sin'] = np.sin(2 * np.pi * df['year'] / 100)
-        df['year_cos'] = np.cos(2 * np.pi * df['year'] / 100)
+        columns['decade'] = (year // 10) * 10
+        columns['half_century'] = (year // 50) * 50
+        columns['year_sin'] = np.sin(2 * np.pi * year / 100)
+        columns['year_cos'] = np.cos(2 * np.pi * year / 100)
         
         # Time since reference point
-        df['years_since_1950'] = df['year'] - 1950
-        df['years_since_2000'] = df['year'] - 2000
+        columns['years_since_1950'] = year - 1950
+        columns['years_since_2000'] = year - 2000
         
         # Economic cycle phases (simplified)
-        df['economic_cycle'] = np.sin(2 * np.pi * (df['year'] - 1950) / 10)
+        columns['economic_cycle'] = np.sin(2 * np.pi * (year - 1950) / 10)
         
         # Seasonality indicators (if monthly data existed)
-        df['quarter'] = ((df['year'] % 4) + 1)  # Simplified
+        columns['quarter'] = ((year % 4) + 1)  # Simplified
         
-        return df
+        return columns
     
-    def _create_demographic_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_demographic_features(self, frame: FeatureFrame) -> Dict[str, Any]:
         """Create advanced demographic features"""
-        df = df.copy()
+        columns = {}
         
-        # Population growth metrics
-        df['population_growth_pct'] = df.groupby('country')['population'].pct_change() * 100
-        df['population_growth_abs'] = df.groupby('country')['population'].diff()
+        # Population growth metrics (against the previous year of the same country)
+        population = frame['population'].to_numpy(dtype=float)
+        previous = frame.segments.shift(population, [1])[:, 0, 0]
+        columns['population_growth_pct'] = (population / previous - 1) * 100
+        columns['population_growth_abs'] = population - previous
         
         # Demographic transition stage
-        df['demographic_transition'] = np.where(
-            (df['birth_rate'] > 30) & (df['death_rate'] > 20), 'Stage 1',
-            np.where((df['birth_rate'] > 20) & (df['death_rate'] < 15), 'Stage 2',
-                    np.where((df['birth_rate'] < 20) & (df['death_rate'] < 10), 'Stage 3', 'Stage 4'))
+        columns['demographic_transition'] = np.where(
+            (frame['birth_rate'] > 30) & (frame['death_rate'] > 20), 'Stage 1',
+            np.where((frame['birth_rate'] > 20) & (frame['death_rate'] < 15), 'Stage 2',
+                    np.where((frame['birth_rate'] < 20) & (frame['death_rate'] < 10), 'Stage 3', 'Stage 4'))
         )
         
         # Age structure indicators
-        df['youth_dependency'] = df['dependency_ratio'] * 0.6  # Approximation
-        df['elderly_dependency'] = df['dependency_ratio'] * 0.4  # Approximation
-        df['working_age_ratio'] = 1 - df['dependency_ratio']
+        columns['youth_dependency'] = frame['dependency_ratio'] * 0.6  # Approximation
+        columns['elderly_dependency'] = frame['dependency_ratio'] * 0.4  # Approximation
+        columns['working_age_ratio'] = 1 - frame['dependency_ratio']
         
         # Sex ratio indicators
-        df['sex_ratio_deviation'] = df['sex_ratio'] - 100
-        df['male_surplus'] = np.where(df['sex_ratio'] > 105, 1, 0)
+        columns['sex_ratio_deviation'] = frame['sex_ratio'] - 100
+        columns['male_surplus'] = np.where(frame['sex_ratio'] > 105, 1, 0)
         
         # Fertility analysis
-        df['fertility_deviation'] = df['fertility_rate'] - 2.1  # Replacement level
-        df['below_replacement'] = np.where(df['fertility_rate'] < 2.1, 1, 0)
+        columns['fertility_deviation'] = frame['fertility_rate'] - 2.1  # Replacement level
+        columns['below_replacement'] = np.where(frame['fertility_rate'] < 2.1, 1, 0)
         
         # Mortality analysis
-        df['premature_mortality'] = df['death_rate'] * (70 - df['life_expectancy'].clip(upper=70)) / 70
+        columns['premature_mortality'] = frame['death_rate'] * (70 - frame['life_expectancy'].clip(upper=70)) / 70
         
         # Migration impact
-        df['net_migration_rate'] = df['migration_rate']
-        df['migration_impact'] = df['net_migration_rate'] / df['growth_rate'].clip(lower=0.1)
+        columns['net_migration_rate'] = frame['migration_rate']
+        columns['migration_impact'] = columns['net_migration_rate'] / frame['growth_rate'].clip(lower=0.1)
         
         # Urbanization stage
-        df['urbanization_stage'] = np.where(
-            df['urbanization_rate'] < 0.3, 'Early',
-            np.where(df['urbanization_rate'] < 0.6, 'Mid',
-                    np.where(df['urbanization_rate'] < 0.8, 'Late', 'Mature'))
+        columns['urbanization_stage'] = np.where(
+            frame['urbanization_rate'] < 0.3, 'Early',
+            np.where(frame['urbanization_rate'] < 0.6, 'Mid',
+                    np.where(frame['urbanization_rate'] < 0.8, 'Late', 'Mature'))
         )
         
         # Demographic dividend indicator
-        df['demographic_dividend'] = (
-            (df['working_age_ratio'] > 0.65) & 
-            (df['dependency_ratio'] < 0.5) &
-            (df['fertility_rate'] < 3)
+        columns['demographic_dividend'] = (
+            (columns['working_age_ratio'] > 0.65) & 
+            (frame['dependency_ratio'] < 0.5) &
+            (frame['fertility_rate'] < 3)
         ).astype(int)
         
         # Population momentum
-        df['population_momentum'] = df['fertility_rate'] * df['youth_dependency']
+        columns['population_momentum'] = frame['fertility_rate'] * columns['youth_dependency']
         
-        return df
+        return columns
     
-    def _create_economic_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_economic_features(self, frame: FeatureFrame) -> Dict[str, Any]:
         """Create economic features"""
-        df = df.copy()
+        columns = {}
         
         # GDP metrics
-        df['gdp_total_log'] = np.log1p(df['gdp_total'])
-        df['gdp_per_capita_log'] = np.log1p(df['gdp_per_capita'])
-        df['gdp_growth'] = df.groupby('country')['gdp_total'].pct_change() * 100
+        gdp_total = frame['gdp_total'].to_numpy(dtype=float)
+        columns['gdp_total_log'] = np.log1p(frame['gdp_total'])
+        columns['gdp_per_capita_log'] = np.log1p(frame['gdp_per_capita'])
+        columns['gdp_growth'] = (gdp_total / frame.segments.shift(gdp_total, [1])[:, 0, 0] - 1) * 100
         
         # Economic development stage
-        df['development_stage'] = np.where(
-            df['gdp_per_capita'] < 1000, 'Low Income',
-            np.where(df['gdp_per_capita'] < 4000, 'Lower Middle',
-                    np.where(df['gdp_per_capita'] < 12000, 'Upper Middle',
+        columns['development_stage'] = np.where(
+            frame['gdp_per_capita'] < 1000, 'Low Income',
+            np.where(frame['gdp_per_capita'] < 4000, 'Lower Middle',
+                    np.where(frame['gdp_per_capita'] < 12000, 'Upper Middle',
                             'High Income'))
         )
         
         # Economic complexity
-        df['economic_complexity'] = np.log1p(df['gdp_total']) * df['urbanization_rate'] * df['education_index']
+        columns['economic_complexity'] = np.log1p(frame['gdp_total']) * frame['urbanization_rate'] * frame['education_index']
         
         # Productivity measures
-        df['labor_productivity'] = df['gdp_total'] / (df['population'] * df['working_age_ratio'])
-        df['capital_intensity'] = np.log1p(df['gdp_total']) / np.log1p(df['population'])
+        columns['labor_productivity'] = frame['gdp_total'] / (frame['population'] * frame['working_age_ratio'])
+        columns['capital_intensity'] = np.log1p(frame['gdp_total']) / np.log1p(frame['population'])
         
         # Income inequality proxy
-        df['inequality_proxy'] = 1 / (1 + np.exp(-0.1 * (df['gdp_per_capita'] - 5000)))
+        columns['inequality_proxy'] = 1 / (1 + np.exp(-0.1 * (frame['gdp_per_capita'] - 5000)))
         
-        # Economic stability
-        df['gdp_volatility'] = df.groupby('country')['gdp_growth'].rolling(5, min_periods=3).std().reset_index(level=0, drop=True)
+        # Economic stability (5-year rolling std of growth, at least 3 observations)
+        count, _, variance = frame.segments.rolling_moments(columns['gdp_growth'], [5])[5]
+        columns['gdp_volatility'] = np.where(count[:, 0] >= 3, np.sqrt(variance[:, 0]), np.nan)
         
         # Investment indicators
-        df['investment_rate'] = np.random.uniform(0.1, 0.4, len(df))  # Placeholder
-        df['savings_rate'] = np.random.uniform(0.05, 0.3, len(df))  # Placeholder
+        columns['investment_rate'] = self._placeholder_uniform(frame, 'economic', 'investment_rate', 0.1, 0.4)
+        columns['savings_rate'] = self._placeholder_uniform(frame, 'economic', 'savings_rate', 0.05, 0.3)
         
-        return df
+        return columns
+    
+    def _rng(self, *keys: Union[str, int]) -> np.random.Generator:
+        """Independent random stream for a stage/column/country key (as ``PopulationDataGenerator._rng``)"""
+        spawn_key = tuple(zlib.crc32(k.encode('utf-8')) if isinstance(k, str) else int(k) for k in keys)
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=spawn_key))
+    
+    def _placeholder_uniform(self, frame: FeatureFrame, stage: str, col: str, low: float, high: float) -> np.ndarray:
+        """Placeholder uniform draws, one per (country, year)
+        
+        Each country draws from its own stream, indexed by year, so a row's
+        value never depends on the other rows processed with it (shards,
+        out-of-core partitions or incremental lookback context).
+        """
+        values = np.empty(len(frame))
+        offsets = np.maximum(np.floor(frame['year'].to_numpy(dtype=float)).astype(int) - self.PLACEHOLDER_ORIGIN_YEAR, 0)
+        countries = frame['country'].to_numpy()
+        segments = frame.segments
+        for start, length in zip(segments.starts, segments.lengths):
+            rows = slice(start, start + length)
+            draws = self._rng(stage, col, str(countries[start])).uniform(low, high, offsets[rows].max() + 1)
+            values[rows] = draws[offsets[rows]]
+        return values
     
-    def _create_social_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_social_features(self, frame: FeatureFrame) -> Dict[str, Any]:
         """Create social development features"""
-        df = df.copy()
+        columns = {}
         
         # Human development composite
-        df['human_development_index'] = (
-            df['life_expectancy'] / 85 +  # Health
-            df['education_index'] +       # Education
-            df['gdp_per_capita_log'] / 12  # Income (normalized)
+        columns['human_development_index'] = (
+            frame['life_expectancy'] / 85 +  # Health
+            frame['education_index'] +       # Education
+            frame['gdp_per_capita_log'] / 12  # Income (normalized)
         ) / 3
         
         # Social inequality measures
-        df['gender_inequality'] = 1 - (df['literacy_rate'] * 0.3 + df['education_index'] * 0.4 + (1 - df['unemployment_rate']/100) * 0.3)
+        columns['gender_inequality'] = 1 - (frame['literacy_rate'] * 0.3 + frame['education_index'] * 0.4 + (1 - frame['unemployment_rate']/100) * 0.3)
         
         # Education metrics
-        df['education_gap'] = 1 - df['education_index']
-        df['literacy_deviation'] = df['literacy_rate'] - 0.9  # Target 90%
+        columns['education_gap'] = 1 - frame['education_index']
+        columns['literacy_deviation'] = frame['literacy_rate'] - 0.9  # Target 90%
         
         # Healthcare metrics
-        df['healthcare_gap'] = 1 - df['healthcare_index']
-        df['life_expectancy_gap'] = 85 - df['life_expectancy']  # Target 85 years
+        columns['healthcare_gap'] = 1 - frame['healthcare_index']
+        columns['life_expectancy_gap'] = 85 - frame['life_expectancy']  # Target 85 years
         
         # Poverty metrics
-        df['poverty_severity'] = df['poverty_rate'] * (1 - df['gdp_per_capita'] / 20000).clip(lower=0)
+        columns['poverty_severity'] = frame['poverty_rate'] * (1 - frame['gdp_per_capita'] / 20000).clip(lower=0)
         
         # Social stability
-        df['social_stability'] = (
-            (1 - df['unemployment_rate']/100) * 0.3 +
-            (1 - df['poverty_rate']/100) * 0.3 +
-            df['political_stability'] * 0.2 +
-            df['happiness_index']/10 * 0.2
+        columns['social_stability'] = (
+            (1 - frame['unemployment_rate']/100) * 0.3 +
+            (1 - frame['poverty_rate']/100) * 0.3 +
+            frame['political_stability'] * 0.2 +
+            frame['happiness_index']/10 * 0.2
         )
         
         # Digital development
-        df['digital_divide'] = 1 - df['digital_adoption']
-        df['tech_readiness'] = df['digital_adoption'] * df['education_index'] * np.log1p(df['gdp_per_capita'])
+        columns['digital_divide'] = 1 - frame['digital_adoption']
+        columns['tech_readiness'] = frame['digital_adoption'] * frame['education_index'] * np.log1p(frame['gdp_per_capita'])
         
         # Social mobility proxy
-        df['social_mobility'] = df['education_index'] * (1 - df['inequality_proxy']) * df['digital_adoption']
+        columns['social_mobility'] = frame['education_index'] * (1 - frame['inequality_proxy']) * frame['digital_adoption']
         
-        return df
+        return columns
     
-    def _create_environmental_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_environmental_features(self, frame: FeatureFrame, fit: bool = True) -> Dict[str, Any]:
         """Create environmental sustainability features"""
-        df = df.copy()
+        columns = {}
         
         # Environmental pressure
-        df['ecological_footprint'] = df['co2_emissions'] * df['energy_consumption'] * df['population_density'] / 1000
-        df['carbon_intensity'] = df['co2_emissions'] / df['gdp_per_capita'].clip(lower=1)
+        columns['ecological_footprint'] = frame['co2_emissions'] * frame['energy_consumption'] * frame['population_density'] / 1000
+        columns['carbon_intensity'] = frame['co2_emissions'] / frame['gdp_per_capita'].clip(lower=1)
         
         # Resource constraints
-        df['water_stress_index'] = df['water_stress'] * (df['population_density'] / 100)
-        df['food_security_index'] = df['food_security'] / (1 + df['population_growth_pct']/100)
+        columns['water_stress_index'] = frame['water_stress'] * (frame['population_density'] / 100)
+        columns['food_security_index'] = frame['food_security'] / (1 + frame['population_growth_pct']/100)
         
         # Environmental sustainability
-        df['environmental_sustainability'] = (
-            (1 - df['ecological_footprint']/df['ecological_footprint'].max()) * 0.4 +
-            (1 - df['water_stress_index']) * 0.3 +
-            df['forest_cover'] * 0.3
+        footprint_max = self.preprocessor.statistic('ecological_footprint_max', columns['ecological_footprint'], 'max', fit)
+        columns['environmental_sustainability'] = (
+            (1 - columns['ecological_footprint']/footprint_max) * 0.4 +
+            (1 - columns['water_stress_index']) * 0.3 +
+            frame['forest_cover'] * 0.3
         )
         
         # Climate vulnerability
-        df['climate_vulnerability'] = (
-            df['water_stress'] * 0.25 +
-            (1 - df['food_security']) * 0.25 +
-            df['natural_hazards'] * 0.25 +
-            (1 - df['infrastructure_quality']) * 0.25
+        columns['climate_vulnerability'] = (
+            frame['water_stress'] * 0.25 +
+            (1 - frame['food_security']) * 0.25 +
+            frame['natural_hazards'] * 0.25 +
+            (1 - frame['infrastructure_quality']) * 0.25
         )
         
         # Renewable energy potential
-        df['renewable_potential'] = np.random.uniform(0.1, 0.9, len(df))  # Placeholder
+        columns['renewable_potential'] = self._placeholder_uniform(frame, 'environmental', 'renewable_potential', 0.1, 0.9)
         
-        return df
+        return columns
     
-    def _create_lag_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_lag_features(self, frame: FeatureFrame, keys: Optional[set] = None) -> Dict[str, Any]:
         """Create lagged features for time series analysis"""
-        df = df.sort_values(['country', 'year'])
         
         # Columns to create lags for
-        lag_columns = [
-            'population', 'birth_rate', 'death_rate', 'gdp_per_capita',
-            'urbanization_rate', 'life_expectancy', 'fertility_rate'
-        ]
+        lag_columns = [col for col in self.LAG_COLUMNS if keys is None or col in keys]
         
-        # Create lags 1-5 years
-        for col in lag_columns:
-            for lag in [1, 2, 3, 4, 5]:
-                df[f'{col}_lag_{lag}'] = df.groupby('country')[col].shift(lag)
+        lags, diffs = self.LAG_PERIODS, self.DIFF_PERIODS
         
-        # Create differences
-        for col in lag_columns:
-            df[f'{col}_diff_1'] = df.groupby('country')[col].diff(1)
-            df[f'{col}_diff_5'] = df.groupby('country')[col].diff(5)
+        # Lags 1-5 years and differences for every column in one block over the country segments
+        values = frame.values(lag_columns)
+        block = np.concatenate([
+            frame.segments.shift(values, lags).reshape(len(frame), -1),
+            frame.segments.diff(values, diffs).reshape(len(frame), -1)
+        ], axis=1)
+        names = ([f'{col}_lag_{lag}' for col in lag_columns for lag in lags] +
+                 [f'{col}_diff_{period}' for col in lag_columns for period in diffs])
         
-        return df
+        return dict(zip(names, block.T))
     
-    def _create_rolling_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_rolling_features(self, frame: FeatureFrame, keys: Optional[set] = None) -> Dict[str, Any]:
         """Create rolling statistics features"""
+        
+        rolling_columns = [col for col in self.ROLLING_COLUMNS if keys is None or col in keys]
+        
+        mean_windows, std_windows, ema_spans = self.ROLLING_MEAN_WINDOWS, self.ROLLING_STD_WINDOWS, self.EMA_SPANS
+        
+        # One fused pass over the country segments for every column, window and span
+        values = frame.values(rolling_columns)
+        moments = frame.segments.rolling_moments(values, sorted(set(mean_windows + std_windows)))
+        ema = frame.segments.ewm_mean(values, ema_spans)
+        
+        columns = {}
+        for j, col in enumerate(rolling_columns):
+            # Rolling means
+            for window in mean_windows:
+                count, mean, _ = moments[window]
+                columns[f'{col}_rolling_mean_{window}'] = np.where(count[:, j] >= 2, mean[:, j], np.nan)
+            
+            # Rolling standard deviations
+            for window in std_windows:
+                count, _, variance = moments[window]
+                columns[f'{col}_rolling_std_{window}'] = np.where(count[:, j] >= 3, np.sqrt(variance[:, j]), np.nan)
+            
+            # Exponential moving averages
+            for k, span in enumerate(ema_spans):
+                columns[f'{col}_ema_{span}'] = ema[:, j, k]
+        
+        return columns
+    
+    def _create_rolling_features_pandas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reference implementation of ``_create_rolling_features`` with grouped pandas windows"""
         df = df.sort_values(['country', 'year'])
         
         rolling_columns = [
@@ -1080,166 +3180,294 @@ class PopulationDataProcessor:
         for col in rolling_columns:
             # Rolling means
             for window in [3, 5, 10]:
-                df[f'{col}_rolling_mean_{window}'] = df.groupby('country')[col].rolling(window, min_periods=2).mean().reset_index(level=0, drop=True)
+                df[f'{col}_rolling_mean_{window}'] = df.groupby('country', observed=True)[col].rolling(window, min_periods=2).mean().reset_index(level=0, drop=True)
             
             # Rolling standard deviations
             for window in [5, 10]:
-                df[f'{col}_rolling_std_{window}'] = df.groupby('country')[col].rolling(window, min_periods=3).std().reset_index(level=0, drop=True)
+                df[f'{col}_rolling_std_{window}'] = df.groupby('country', observed=True)[col].rolling(window, min_periods=3).std().reset_index(level=0, drop=True)
             
             # Exponential moving averages
-            df[f'{col}_ema_3'] = df.groupby('country')[col].transform(lambda x: x.ewm(span=3).mean())
-            df[f'{col}_ema_5'] = df.groupby('country')[col].transform(lambda x: x.ewm(span=5).mean())
+            df[f'{col}_ema_3'] = df.groupby('country', observed=True)[col].transform(lambda x: x.ewm(span=3).mean())
+            df[f'{col}_ema_5'] = df.groupby('country', observed=True)[col].transform(lambda x: x.ewm(span=5).mean())
         
         return df
     
-    def _create_interaction_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def benchmark_rolling_features(self, df: pd.DataFrame, repeats: int = 3) -> Dict[str, float]:
+        """Time the fused rolling kernel against the pandas reference and compare outputs"""
+        timings = {}
+        outputs = {}
+        fused_pipeline = self.build_pipeline(['rolling'], track_memory=False)
+        for name, method in [('fused', fused_pipeline.run),
+                             ('pandas', self._create_rolling_features_pandas)]:
+            runs = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[name] = method(df)
+                runs.append(time.perf_counter() - start)
+            timings[name] = min(runs)
+        
+        feature_cols = [c for c in outputs['pandas'].columns if c not in df.columns]
+        fused = outputs['fused'][feature_cols].to_numpy(dtype=float)
+        reference = outputs['pandas'][feature_cols].to_numpy(dtype=float)
+        scale = np.maximum(np.abs(reference), 1.0)
+        
+        results = {
+            'rows': len(df),
+            'features': len(feature_cols),
+            'fused_seconds': timings['fused'],
+            'pandas_seconds': timings['pandas'],
+            'speedup': timings['pandas'] / timings['fused'],
+            'max_scaled_error': float(np.nanmax(np.abs(fused - reference) / scale)),
+            'nan_mismatches': int((np.isnan(fused) != np.isnan(reference)).sum())
+        }
+        logger.info(f"Rolling features on {len(df)} rows: fused {timings['fused']:.3f}s, "
+                    f"pandas {timings['pandas']:.3f}s ({results['speedup']:.1f}x), "
+                    f"max scaled error {results['max_scaled_error']:.2e}")
+        return results
+    
+    def _create_interaction_features(self, frame: FeatureFrame, fit: bool = True) -> Dict[str, Any]:
         """Create interaction features between important variables"""
+        columns = {}
         
         # Demographic interactions
-        df['birth_death_ratio'] = df['birth_rate'] / df['death_rate'].clip(lower=0.1)
-        df['pop_density_gdp'] = df['population_density'] * np.log1p(df['gdp_per_capita'])
-        df['urban_education'] = df['urbanization_rate'] * df['education_index']
-        df['life_exp_gdp'] = df['life_expectancy'] * np.log1p(df['gdp_per_capita'])
+        columns['birth_death_ratio'] = frame['birth_rate'] / frame['death_rate'].clip(lower=0.1)
+        columns['pop_density_gdp'] = frame['population_density'] * np.log1p(frame['gdp_per_capita'])
+        columns['urban_education'] = frame['urbanization_rate'] * frame['education_index']
+        columns['life_exp_gdp'] = frame['life_expectancy'] * np.log1p(frame['gdp_per_capita'])
         
         # Economic-demographic interactions
-        df['gdp_pop_growth'] = df['gdp_growth'] * df['population_growth_pct']
-        df['fertility_education'] = df['fertility_rate'] * (1 - df['education_index'])
+        columns['gdp_pop_growth'] = frame['gdp_growth'] * frame['population_growth_pct']
+        columns['fertility_education'] = frame['fertility_rate'] * (1 - frame['education_index'])
         
         # Social-environmental interactions
-        df['health_env'] = df['healthcare_index'] * (1 - df['ecological_footprint']/df['ecological_footprint'].max())
-        df['edu_tech'] = df['education_index'] * df['digital_adoption']
+        footprint_max = self.preprocessor.statistic('ecological_footprint_max', frame['ecological_footprint'], 'max', fit)
+        columns['health_env'] = frame['healthcare_index'] * (1 - frame['ecological_footprint']/footprint_max)
+        columns['edu_tech'] = frame['education_index'] * frame['digital_adoption']
         
         # Complex interactions
-        df['development_triangle'] = (
-            df['human_development_index'] * 
-            df['economic_complexity'] * 
-            df['environmental_sustainability']
+        columns['development_triangle'] = (
+            frame['human_development_index'] * 
+            frame['economic_complexity'] * 
+            frame['environmental_sustainability']
         )
         
-        return df
+        return columns
     
-    def _create_polynomial_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_polynomial_features(self, frame: FeatureFrame, keys: Optional[set] = None) -> Dict[str, Any]:
         """Create polynomial features for key variables"""
         
-        key_variables = [
-            'gdp_per_capita', 'life_expectancy', 'urbanization_rate',
-            'education_index', 'fertility_rate'
-        ]
+        key_variables = [var for var in self.POLYNOMIAL_VARIABLES if keys is None or var in keys]
         
+        columns = {}
         for var in key_variables:
-            df[f'{var}_squared'] = df[var] ** 2
-            df[f'{var}_cubed'] = df[var] ** 3
-            df[f'{var}_log'] = np.log1p(df[var])
-            df[f'{var}_sqrt'] = np.sqrt(df[var].clip(lower=0))
+            columns[f'{var}_squared'] = frame[var] ** 2
+            columns[f'{var}_cubed'] = frame[var] ** 3
+            columns[f'{var}_log'] = np.log1p(frame[var])
+            columns[f'{var}_sqrt'] = np.sqrt(frame[var].clip(lower=0))
         
-        return df
+        return columns
     
-    def _normalize_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _normalize_features(self, frame: FeatureFrame, fit: bool = True, keys: Optional[set] = None) -> Dict[str, Any]:
         """Normalize numerical features"""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        if fit:
+            self._fit_normalization(frame, keys)
+        
+        # Apply robust scaling (less sensitive to outliers)
+        return self.preprocessor.scaled_columns(frame, keys)
+    
+    def _fit_normalization(self, frame: Union[FeatureFrame, ParquetColumns], keys: Optional[set] = None,
+                           block_columns: int = FeatureFrame.BLOCK_COLUMNS) -> None:
+        """Fit the robust scaling of the numeric feature columns"""
+        numeric_cols = frame.select_dtypes(include=[np.number])
         
         # Exclude year and other ID columns from normalization
         exclude_cols = ['year', 'decade', 'half_century', 'years_since_1950', 
                        'years_since_2000', 'quarter', 'country_encoded']
-        normalize_cols = [col for col in numeric_cols if col not in exclude_cols]
-        
-        # Apply robust scaling (less sensitive to outliers)
-        for col in normalize_cols:
-            if df[col].std() > 0:  # Avoid division by zero
-                median = df[col].median()
-                iqr = df[col].quantile(0.75) - df[col].quantile(0.25)
-                if iqr > 0:
-                    df[f'{col}_scaled'] = (df[col] - median) / iqr
-        
-        return df
+        normalize_cols = [col for col in numeric_cols if col not in exclude_cols and (keys is None or col in keys)]
+        self.preprocessor.fit_scaling(frame, normalize_cols, block_columns)
     
-    def _encode_categorical_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _encode_categorical_features(self, frame: FeatureFrame, fit: bool = True, keys: Optional[set] = None) -> Dict[str, Any]:
         """Encode categorical features"""
-        
-        # Country encoding (target encoding based on average population)
-        if 'country' in df.columns:
-            country_means = df.groupby('country')['population'].mean()
-            df['country_encoded'] = df['country'].map(country_means)
-        
-        # Region encoding
-        if 'region' in df.columns:
-            region_dict = {region: i for i, region in enumerate(df['region'].unique())}
-            df['region_encoded'] = df['region'].map(region_dict)
-        
-        # Development stage encoding
-        if 'development_stage' in df.columns:
-            stage_order = {'Low Income': 0, 'Lower Middle': 1, 'Upper Middle': 2, 'High Income': 3}
-            df['development_stage_encoded'] = df['development_stage'].map(stage_order)
-        
-        # One-hot encoding for other categoricals
-        categorical_cols = df.select_dtypes(include=['object']).columns
-        for col in categorical_cols:
-            if col not in ['country', 'region'] and df[col].nunique() <= 10:
-                dummies = pd.get_dummies(df[col], prefix=col, drop_first=True)
-                df = pd.concat([df, dummies], axis=1)
-        
-        return df
+        if fit:
+            self.preprocessor.fit_encoding(frame)
+        return self.preprocessor.encoded_columns(frame, keys)
+    
+    def save_preprocessor(self, path: Union[str, Path] = 'models/preprocessor.pkl') -> Path:
+        """Persist the fitted scaling/encoding statistics"""
+        return self.preprocessor.save(path)
+    
+    def load_preprocessor(self, path: Union[str, Path] = 'models/preprocessor.pkl') -> None:
+        """Load statistics for ``preprocess_world_data(..., fit=False)``"""
+        self.preprocessor = FittedPreprocessor.load(path)
     
-    def _create_target_variables(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _create_target_variables(self, frame: FeatureFrame, fit: bool = True, keys: Optional[set] = None) -> Dict[str, Any]:
         """Create target variables for predictive modeling"""
+        columns = {}
+        
+        def lead(col: str, periods: int) -> np.ndarray:
+            # Value ``periods`` rows ahead within the same country
+            return frame.segments.shift(frame[col].to_numpy(dtype=float), [-periods])[:, 0, 0]
+        
+        def wanted(target: str) -> bool:
+            return keys is None or target in keys
         
         # Population growth target (next 5 years)
-        df = df.sort_values(['country', 'year'])
-        df['population_next_5'] = df.groupby('country')['population'].shift(-5)
-        df['pop_growth_5yr'] = ((df['population_next_5'] / df['population']) ** (1/5) - 1) * 100
+        if wanted('population_next_5'):
+            columns['population_next_5'] = lead('population', 5)
+            columns['pop_growth_5yr'] = ((columns['population_next_5'] / frame['population']) ** (1/5) - 1) * 100
         
         # Birth rate target (next year)
-        df['birth_rate_next'] = df.groupby('country')['birth_rate'].shift(-1)
+        if wanted('birth_rate_next'):
+            columns['birth_rate_next'] = lead('birth_rate', 1)
         
         # Life expectancy target (next 10 years)
-        df['life_exp_next_10'] = df.groupby('country')['life_expectancy'].shift(-10)
+        if wanted('life_exp_next_10'):
+            columns['life_exp_next_10'] = lead('life_expectancy', 10)
         
         # Urbanization target (next 20 years)
-        df['urban_next_20'] = df.groupby('country')['urbanization_rate'].shift(-20)
+        if wanted('urban_next_20'):
+            columns['urban_next_20'] = lead('urbanization_rate', self.TARGET_HORIZON)
         
         # Binary classification targets
-        df['high_growth'] = (df['population_growth_pct'] > df['population_growth_pct'].median()).astype(int)
-        df['aging_population'] = (df['median_age'] > 40).astype(int)
-        df['urban_majority'] = (df['urbanization_rate'] > 0.5).astype(int)
+        if wanted('high_growth'):
+            growth_median = self.preprocessor.statistic('population_growth_pct_median', frame['population_growth_pct'], 'median', fit)
+            columns['high_growth'] = (frame['population_growth_pct'] > growth_median).astype(int)
+        if wanted('aging_population'):
+            columns['aging_population'] = (frame['median_age'] > 40).astype(int)
+        if wanted('urban_majority'):
+            columns['urban_majority'] = (frame['urbanization_rate'] > 0.5).astype(int)
         
         # Multi-class target: Development stage in 10 years
-        df['future_development'] = df.groupby('country')['development_stage_encoded'].shift(-10)
+        if wanted('future_development'):
+            columns['future_development'] = lead('development_stage_encoded', 10)
         
-        return df
+        return columns
     
-    def prepare_training_data(self, df: pd.DataFrame, target: str = 'pop_growth_5yr') -> Tuple[pd.DataFrame, pd.Series]:
-        """Prepare data for machine learning training"""
-        
-        # Remove rows with missing targets
-        df_clean = df.dropna(subset=[target])
+    def prepare_training_data(self, df: pd.DataFrame, target: str = 'pop_growth_5yr',
+                              feature_columns: Optional[List[str]] = None, as_matrix: bool = False,
+                              dtype: Any = np.float64) -> Tuple[Union[pd.DataFrame, DesignMatrix, TrainingMatrix], pd.Series]:
+        """Prepare data for machine learning training
+        
+        With ``feature_columns``, ``df`` may be the raw panel: only those
+        features and the target are computed, through ``compute_features``.
+        With a ``sparse_one_hot`` preprocessor, X is a ``DesignMatrix``
+        whose one-hot block is built as CSR from the categorical columns.
+        With ``as_matrix``, X is a ``TrainingMatrix``: the numeric features
+        of the complete rows written straight into one C-contiguous
+        ``dtype`` array, without intermediate frame copies.
+        """
+        if as_matrix and self.preprocessor.sparse_one_hot:
+            raise ValueError("as_matrix is not available with a sparse_one_hot preprocessor")
+        
+        if self.cache is not None:
+            # Computing features on an unfitted preprocessor fits it from df alone
+            fitting = feature_columns is not None and not self.preprocessor.is_fitted
+            cache_key = partial(self.cache.key, df, target=target, feature_columns=feature_columns,
+                                as_matrix=as_matrix, dtype=np.dtype(dtype).str, seed=self.seed,
+                                sparse_one_hot=self.preprocessor.sparse_one_hot)
+            key = cache_key(preprocessor=None if fitting else self.preprocessor.fingerprint())
+            cached = self.cache.load(key, 'prepare_training_data')
+            if cached is not None:
+                frames, self.preprocessor = cached
+                X, y = frames['X'], frames['y'][target]
+                if 'one_hot_codes' in frames:
+                    X = self._design_matrix(X, frames['one_hot_codes'].to_numpy())
+                if as_matrix:
+                    X = TrainingMatrix(np.ascontiguousarray(X.to_numpy(dtype=dtype)), list(X.columns))
+                self.feature_columns = list(X.columns)
+                self.target_columns = target
+                return X, y
+        
+        if feature_columns is not None:
+            df = self.compute_features(df, list(feature_columns) + [target])
         
         # Select feature columns (exclude targets and identifiers)
-        exclude_cols = [
+        exclude_cols = {
             'country', 'region', 'year', 'population_next_5', 'birth_rate_next',
             'life_exp_next_10', 'urban_next_20', 'future_development'
-        ]
+        }
         
         # Also exclude the target and other future targets
-        future_targets = [col for col in df.columns if 'next' in col or 'future' in col]
-        exclude_cols.extend(future_targets)
+        exclude_cols.update(col for col in df.columns if 'next' in col or 'future' in col)
+        
+        feature_cols = ([col for col in df.columns if col not in exclude_cols]
+                        if feature_columns is None else list(feature_columns))
         
-        feature_cols = [col for col in df_clean.columns if col not in exclude_cols]
+        # Sparse one-hot mode: categorical sources go into the CSR block instead
+        sparse_one_hot = self.preprocessor.sparse_one_hot
+        if sparse_one_hot:
+            feature_cols = [col for col in feature_cols if col not in self.preprocessor.one_hot_categories]
         
-        # Separate features and target
-        X = df_clean[feature_cols].copy()
-        y = df_clean[target].copy()
+        if as_matrix:
+            X, y = self._training_matrix(df, feature_cols, target, dtype, requested=feature_columns is not None)
+            frames = {'X': pd.DataFrame(X.values, index=y.index, columns=X.columns, copy=False), 'y': y.to_frame()}
+        else:
+            # Remove rows with missing targets
+            df_clean = df.dropna(subset=[target])
+            
+            # Separate features and target
+            X = df_clean[feature_cols].copy()
+            y = df_clean[target].copy()
+            
+            # Remove any remaining NaN values
+            nan_mask = X.isna().any(axis=1) | y.isna()
+            X = X[~nan_mask]
+            y = y[~nan_mask]
+            frames = {'X': X, 'y': y.to_frame()}
         
-        # Remove any remaining NaN values
-        nan_mask = X.isna().any(axis=1) | y.isna()
-        X = X[~nan_mask]
-        y = y[~nan_mask]
+        if sparse_one_hot:
+            codes = self.preprocessor.one_hot_codes(df_clean)[~nan_mask.to_numpy()]
+            frames['one_hot_codes'] = pd.DataFrame(codes, columns=list(self.preprocessor.one_hot_categories))
+            X = self._design_matrix(X, codes)
         
         # Store feature and target columns
         self.feature_columns = list(X.columns)
         self.target_columns = target
         
         logger.info(f"Training data prepared: X shape = {X.shape}, y shape = {y.shape}")
+        if self.cache is not None:
+            self.cache.store(key, frames, self.preprocessor)
+            if fitting:
+                # Repeat calls apply the statistics just fitted on this df, which gives the same result
+                self.cache.store(cache_key(preprocessor=self.preprocessor.fingerprint()), frames, self.preprocessor)
         return X, y
+    
+    def _training_matrix(self, df: pd.DataFrame, feature_cols: List[str], target: str, dtype: Any,
+                         requested: bool = False) -> Tuple[TrainingMatrix, pd.Series]:
+        """Numeric features of the rows with no missing values, in one C-contiguous allocation
+        
+        Rows are kept on the same columns as the frame path, text columns
+        included; those cannot go into the array, so they are left out (an
+        error if the caller ``requested`` them by name).
+        """
+        # One lookup per column
+        arrays = {col: df[col].to_numpy() for col in feature_cols}
+        excluded = [col for col in feature_cols if not pd.api.types.is_numeric_dtype(df[col].dtype)]
+        if excluded and requested:
+            raise ValueError(f"as_matrix needs numeric features; requested non-numeric columns: {excluded}")
+        if excluded:
+            logger.info(f"Training matrix leaves out non-numeric columns: {excluded}")
+        
+        # Rows with the target and every feature present
+        y = df[target]
+        complete = ~pd.isna(y.to_numpy())
+        for column in arrays.values():
+            if column.dtype.kind == 'f':
+                complete &= ~np.isnan(column)
+            elif column.dtype.kind not in 'biu':
+                complete &= ~pd.isna(column)
+        rows = np.flatnonzero(complete)
+        
+        numeric = [col for col in feature_cols if col not in set(excluded)]
+        values = np.empty((len(rows), len(numeric)), dtype=dtype)
+        for j, col in enumerate(numeric):
+            values[:, j] = arrays[col][rows]
+        return TrainingMatrix(values, numeric), y.iloc[rows]
+    
+    def _design_matrix(self, dense: pd.DataFrame, codes: np.ndarray) -> DesignMatrix:
+        """Dense features beside the CSR one-hot block of the given codes"""
+        return DesignMatrix(dense, self.preprocessor.one_hot_matrix(None, codes=codes),
+                            self.preprocessor.one_hot_columns())
 
 
 # ============================================================================
@@ -1249,9 +3477,10 @@ class PopulationDataProcessor:
 class PopulationVisualizer:
     """Advanced population data visualization with multiple chart types"""
     
-    def __init__(self, style: str = 'darkgrid'):
+    def __init__(self, style: str = 'darkgrid', seed: int = 42):
         """Initialize visualizer with style preferences"""
         plt.style.use(f'seaborn-v0_8-{style}')
+        self.seed = seed  # Simulated chart data draws from its own seeded stream
         self.colors = {
             'primary': ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#3B1F2B'],
             'sequential': ['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', 
@@ -1268,7 +3497,7 @@ class PopulationVisualizer:
         logger.info(f"Creating comprehensive dashboard for {country if country else 'all countries'}")
         
         if country:
-            df_filtered = df[df['country'] == country].copy()
+            df_filtered = country_slice(df, country).copy()
             title_suffix = f" - {country}"
         else:
             df_filtered = df.copy()
@@ -1381,8 +3610,7 @@ class PopulationVisualizer:
         # 1. Interactive Population Trend
         fig1 = go.Figure()
         
-        for country in df['country'].unique()[:10]:  # Limit to 10 countries for clarity
-            country_data = df[df['country'] == country]
+        for country, country_data in itertools.islice(CountrySliceIndex.for_frame(df).items(), 10):  # Limit to 10 countries for clarity
             fig1.add_trace(go.Scatter(
                 x=country_data['year'],
                 y=country_data['population'],
@@ -1506,7 +3734,7 @@ class PopulationVisualizer:
         
         # 1. Ridgeline Plot for Population Distribution
         fig, axes = joypy.joyplot(
-            data=df.pivot_table(index='year', columns='country', values='population').iloc[:, :10],
+            data=PopulationPanel.from_frame(df, ['population'], duplicates='mean').wide('population').iloc[:, :10],
             figsize=(12, 8),
             colormap=cm.viridis,
             overlap=2,
@@ -1544,7 +3772,7 @@ class PopulationVisualizer:
         
         # 4. Stacked Area Chart: Population by Region Over Time
         region_pop = df.pivot_table(index='year', columns='region', 
-                                   values='population', aggfunc='sum')
+                                   values='population', aggfunc='sum', observed=True)
         
         plt.figure(figsize=(14, 8))
         region_pop.plot.area(alpha=0.8, cmap='Set3')
@@ -1603,7 +3831,7 @@ class PopulationVisualizer:
     def _plot_population_trend_with_ci(self, ax, df, country=None):
         """Plot population trend with confidence intervals"""
         if country:
-            data = df[df['country'] == country]
+            data = country_slice(df, country)
             ax.plot(data['year'], data['population'], linewidth=3, color=self.colors['primary'][0])
             ax.fill_between(data['year'], 
                            data['population'] * 0.95, 
@@ -1612,8 +3840,7 @@ class PopulationVisualizer:
             ax.set_title(f'Population Trend: {country}', fontweight='bold')
         else:
             # Plot multiple countries
-            for i, country in enumerate(df['country'].unique()[:5]):
-                country_data = df[df['country'] == country]
+            for i, (country, country_data) in enumerate(itertools.islice(CountrySliceIndex.for_frame(df).items(), 5)):
                 ax.plot(country_data['year'], country_data['population'], 
                        linewidth=2, label=country, color=self.colors['categorical'][i])
             ax.set_title('Population Trends (Top 5 Countries)', fontweight='bold')
@@ -1723,8 +3950,7 @@ class PopulationVisualizer:
             ax.set_title('Urbanization Trend', fontweight='bold')
         else:
             # Multiple countries
-            for i, country in enumerate(df['country'].unique()[:5]):
-                country_data = df[df['country'] == country]
+            for i, (country, country_data) in enumerate(itertools.islice(CountrySliceIndex.for_frame(df).items(), 5)):
                 ax.plot(country_data['year'], country_data['urbanization_rate'], 
                        linewidth=2, label=country, color=self.colors['categorical'][i])
             ax.set_title('Urbanization Trends (Top 5)', fontweight='bold')
@@ -2313,6 +4539,7 @@ class PopulationVisualizer:
         # In a real implementation, this would use actual migration data
         migration_data = []
         countries = df['country'].unique()[:10]  # Limit to 10 countries
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(b'migration_matrix'),)))
         
         for origin in countries:
             for destination in countries:
@@ -2320,7 +4547,7 @@ class PopulationVisualizer:
                     migration_data.append({
                         'origin_country': origin,
                         'destination_country': destination,
-                        'migrants': np.random.poisson(10000)
+                        'migrants': rng.poisson(10000)
                     })
         
         return pd.DataFrame(migration_data)
@@ -2340,18 +4567,37 @@ class PopulationPredictor:
         self.best_models = {}
         self.forecast_results = {}
         
-    def train_ensemble_models(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.2) -> Dict[str, Any]:
-        """Train multiple machine learning models for population prediction"""
-        logger.info("Training ensemble of predictive models")
+    def train_ensemble_models(self, X: Union[pd.DataFrame, DesignMatrix, TrainingMatrix], y: pd.Series,
+                              test_size: float = 0.2) -> Dict[str, Any]:
+        """Train multiple machine learning models for population prediction
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, shuffle=False
-        )
+        A ``DesignMatrix`` is fed to the models as CSR: only its dense block
+        is standardized and the one-hot block is never densified. A
+        ``TrainingMatrix`` reuses its cached standardized array.
+        """
+        logger.info("Training ensemble of predictive models")
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Same chronological split as train_test_split(shuffle=False)
+        n_train = len(X) - int(np.ceil(test_size * len(X)))
+        if isinstance(X, TrainingMatrix):
+            # Standardized once per matrix; train and test are views of it
+            scaled, self.scaler = X.standardized(n_train)
+            X_train_scaled, X_test_scaled = scaled[:n_train], scaled[n_train:]
+            y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
+        elif isinstance(X, DesignMatrix):
+            train, test = X.rows(slice(None, n_train)), X.rows(slice(n_train, None))
+            y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
+            X_train_scaled = train.to_sparse(self.scaler.fit_transform(train.dense))
+            X_test_scaled = test.to_sparse(self.scaler.transform(test.dense))
+        else:
+            # Split data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42, shuffle=False
+            )
+            
+            # Scale features
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
         
         # Define models to train
         models = {
@@ -2594,7 +4840,7 @@ class PopulationPredictor:
         logger.info(f"Predicting population scenarios for {country} for {years} years")
         
         # Filter data for the country
-        country_data = df[df['country'] == country].copy()
+        country_data = country_slice(df, country).copy()
         
         if len(country_data) < 10:
             logger.warning(f"Insufficient data for {country}")
@@ -2694,11 +4940,11 @@ class PopulationPredictor:
         
         results = {}
         
-        # Get unique countries
-        countries = df['country'].unique()
+        # Per-country views from the slice index
+        slice_index = CountrySliceIndex.for_frame(df)
         
-        for country in countries[:10]:  # Limit to 10 countries for performance
-            country_data = df[df['country'] == country].copy()
+        for country in slice_index.countries[:10]:  # Limit to 10 countries for performance
+            country_data = slice_index.get(country).copy()
             
             if len(country_data) < 5:
                 continue
@@ -2755,17 +5001,22 @@ class PopulationPredictor:
         
         return results
     
-    def evaluate_model_performance(self, X_test: pd.DataFrame, y_test: pd.Series) -> pd.DataFrame:
+    def evaluate_model_performance(self, X_test: Union[pd.DataFrame, DesignMatrix, TrainingMatrix],
+                                   y_test: pd.Series) -> pd.DataFrame:
         """Evaluate all trained models on test data"""
         logger.info("Evaluating model performance")
         
         performance_data = []
         
+        # Scale test data (once, for every model)
+        try:
+            X_test_scaled = self._scale_features(X_test)
+        except Exception as e:
+            logger.warning(f"Error scaling evaluation data: {str(e)}")
+            return pd.DataFrame(performance_data)
+        
         for name, model in self.models.items():
             try:
-                # Scale test data
-                X_test_scaled = self.scaler.transform(X_test)
-                
                 # Make predictions
                 y_pred = model.predict(X_test_scaled)
                 
@@ -2797,6 +5048,15 @@ class PopulationPredictor:
         
         return performance_df
     
+    def _scale_features(self, X: Union[pd.DataFrame, DesignMatrix, TrainingMatrix]) -> Any:
+        """Features scaled by the fitted scaler, in the form the models were trained on"""
+        if isinstance(X, TrainingMatrix):
+            return X.scaled_by(self.scaler)
+        if isinstance(X, DesignMatrix):
+            # Only the dense block is scaled; the one-hot block stays sparse
+            return X.to_sparse(self.scaler.transform(X.dense))
+        return self.scaler.transform(X)
+    
     def plot_forecast_comparison(self, historical_data: pd.Series, forecasts: Dict[str, Any]) -> None:
         """Plot comparison of different forecasting methods"""
         plt.figure(figsize=(14, 8))
@@ -3058,12 +5318,13 @@ class PopulationStatistician:
         
         # Group by country for panel data analysis
         if 'country' in df.columns and 'year' in df.columns:
-            countries = df['country'].unique()[:5]  # Limit to 5 countries
+            slice_index = CountrySliceIndex.for_frame(df)
+            countries = slice_index.countries[:5]  # Limit to 5 countries
             
             time_series_results = {}
             
             for country in countries:
-                country_data = df[df['country'] == country].sort_values('year')
+                country_data = slice_index.get(country)
                 
                 if len(country_data) < 10:
                     continue
@@ -3304,9 +5565,10 @@ class PopulationStatistician:
             valid_regions = region_counts[region_counts >= 5].index.tolist()
             
             if len(valid_regions) >= 2:
-                # Prepare data for ANOVA
-                groups = [latest_data[latest_data['region'] == region]['growth_rate'].dropna().values 
-                         for region in valid_regions]
+                # Prepare data for ANOVA (one pass over the region codes)
+                growth_by_region = {region: values.dropna() for region, values
+                                    in latest_data.groupby('region', observed=True)['growth_rate']}
+                groups = [growth_by_region[region].values for region in valid_regions]
                 
                 # One-way ANOVA
                 f_stat, p_value = stats.f_oneway(*groups)
@@ -3316,12 +5578,9 @@ class PopulationStatistician:
                     'f_statistic': f_stat,
                     'pvalue': p_value,
                     'significant': p_value < 0.05,
-                    'group_means': {region: latest_data[latest_data['region'] == region]['growth_rate'].mean() 
-                                   for region in valid_regions},
-                    'group_stds': {region: latest_data[latest_data['region'] == region]['growth_rate'].std() 
-                                  for region in valid_regions},
-                    'group_counts': {region: len(latest_data[latest_data['region'] == region]['growth_rate'].dropna()) 
-                                    for region in valid_regions}
+                    'group_means': {region: growth_by_region[region].mean() for region in valid_regions},
+                    'group_stds': {region: growth_by_region[region].std() for region in valid_regions},
+                    'group_counts': {region: len(growth_by_region[region]) for region in valid_regions}
                 }
                 
                 # Post-hoc tests if ANOVA is significant
@@ -3332,7 +5591,7 @@ class PopulationStatistician:
                     tukey_data = []
                     tukey_labels = []
                     for i, region in enumerate(valid_regions):
-                        region_data = latest_data[latest_data['region'] == region]['growth_rate'].dropna()
+                        region_data = growth_by_region[region]
                         tukey_data.extend(region_data)
                         tukey_labels.extend([region] * len(region_data))
                     
@@ -3462,10 +5721,11 @@ class PopulationStatistician:
         
         # Logistic growth model fitting
         if 'year' in df.columns and 'population' in df.columns:
-            countries = df['country'].unique()[:5]  # Limit to 5 countries
+            slice_index = CountrySliceIndex.for_frame(df)
+            countries = slice_index.countries[:5]  # Limit to 5 countries
             
             for country in countries:
-                country_data = df[df['country'] == country].sort_values('year')
+                country_data = slice_index.get(country)
                 
                 if len(country_data) < 10:
                     continue
@@ -3524,7 +5784,7 @@ class PopulationStatistician:
         if demographic_models:
             # Compare with exponential model for each country
             for country in list(demographic_models.keys()):
-                country_data = df[df['country'] == country].sort_values('year')
+                country_data = country_slice(df, country)
                 years = country_data['year'].values
                 population = country_data['population'].values
                 
@@ -3551,6 +5811,69 @@ class PopulationStatistician:
 # MAIN APPLICATION AND EXPORT MODULE
 # ============================================================================
 
+@dataclass
+class RenderJob:
+    """One chart-rendering call: a visualizer method and its arguments"""
+    name: str
+    function: Callable
+    args: Tuple = ()
+
+    def run(self) -> Tuple[float, Optional[str]]:
+        """Render, returning the wall time and the error message if it failed"""
+        start = time.perf_counter()
+        try:
+            self.function(*self.args)
+            error = None
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        return time.perf_counter() - start, error
+
+
+class RenderScheduler:
+    """Runs independent chart jobs in a process pool and reports per-job wall times
+
+    Workers render and save their figures themselves with the Agg backend
+    selected at import, so only timings and errors travel back. With one
+    worker (or one job) everything renders in process.
+    """
+
+    def __init__(self, n_workers: Optional[int] = None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.report: List[Dict[str, Any]] = []
+
+    def run(self, jobs: List[RenderJob]) -> List[Dict[str, Any]]:
+        """Render every job, logging and returning ``{'job', 'seconds', 'error'}`` per job
+        
+        A failed job does not stop the others; once all have run and the
+        report is logged, any failures are raised together as a RuntimeError.
+        """
+        start = time.perf_counter()
+        n_workers = min(self.n_workers, len(jobs))
+        if n_workers <= 1:
+            outcomes = [job.run() for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                outcomes = list(pool.map(RenderJob.run, jobs))
+        
+        self.report = []
+        for job, (seconds, error) in zip(jobs, outcomes):
+            if error is None:
+                logger.info(f"Rendered {job.name} in {seconds:.1f}s")
+            else:
+                logger.error(f"Rendering {job.name} failed after {seconds:.1f}s: {error}")
+            self.report.append({'job': job.name, 'seconds': seconds, 'error': error})
+        
+        busy = sum(seconds for seconds, _ in outcomes)
+        logger.info(f"Rendered {len(jobs)} chart jobs in {time.perf_counter() - start:.1f}s "
+                    f"({busy:.1f}s of rendering across {max(n_workers, 1)} workers)")
+        
+        failed = [entry for entry in self.report if entry['error'] is not None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(jobs)} chart jobs failed: " +
+                               "; ".join(f"{entry['job']} ({entry['error']})" for entry in failed))
+        return self.report
+
+
 class PopulationAnalyticsSystem:
     """Main population analytics system integrating all modules"""
     
@@ -3563,6 +5886,11 @@ class PopulationAnalyticsSystem:
         self.data = {}
         self.results = {}
         self.config = self._load_configuration()
+        self.world_source: Optional[str] = None  # World file streamed by the out-of-core path
+        
+        processing = self.config['processing']
+        if processing['cache_dir'] is not None:
+            self.data_processor.cache = ProcessedDataCache(processing['cache_dir'], processing['cache_max_mb'] * 1024 ** 2)
         
     def _load_configuration(self) -> Dict[str, Any]:
         """Load system configuration"""
@@ -3570,7 +5898,17 @@ class PopulationAnalyticsSystem:
             'data_generation': {
                 'start_year': 1950,
                 'end_year': 2100,
-                'n_countries': 20
+                'n_countries': 20,
+                'steps_per_year': 1
+            },
+            'processing': {
+                'track_memory': False,  # Per-stage tracemalloc peaks (slows preprocessing)
+                'n_workers': 1,         # > 1 preprocesses country shards in a process pool
+                'compact': False,       # float32 features, small-int codes and categoricals
+                'cache_dir': None,      # Directory for content-addressed results (requires pyarrow)
+                'cache_max_mb': 2048,
+                'out_of_core_dir': None,  # Stream loaded world data to this Parquet dataset instead
+                'memory_limit_mb': 1024   # Per-partition ceiling of the out-of-core path
             },
             'analysis': {
                 'test_size': 0.2,
@@ -3580,7 +5918,8 @@ class PopulationAnalyticsSystem:
             'visualization': {
                 'style': 'darkgrid',
                 'dpi': 300,
-                'format': 'png'
+                'format': 'png',
+                'n_workers': None  # Render processes (None: one per CPU, 1 renders in process)
             },
             'export': {
                 'save_data': True,
@@ -3628,16 +5967,18 @@ class PopulationAnalyticsSystem:
         # 1. World population dataset
         self.data['world'] = self.data_generator.generate_world_population_dataset(
             start_year=self.config['data_generation']['start_year'],
-            end_year=self.config['data_generation']['end_year']
+            end_year=self.config['data_generation']['end_year'],
+            n_countries=self.config['data_generation']['n_countries'],
+            steps_per_year=self.config['data_generation']['steps_per_year']
         )
         
         # 2. Age structure data for selected countries
-        self.data['age_structures'] = {}
         countries = ['China', 'India', 'United States', 'Japan', 'Germany']
-        for country in countries:
-            self.data['age_structures'][country] = self.data_generator.generate_age_structure_data(
-                country, 2020
-            )
+        age_panel = self.data_generator.generate_age_structure_panel(countries, [2020])
+        self.data['age_structures'] = {
+            country: frame.reset_index(drop=True)
+            for country, frame in age_panel.groupby('country', sort=False, observed=True)
+        }
         
         # 3. Geographic distribution data
         self.data['geographic'] = self.data_generator.generate_geographic_distribution_data()
@@ -3646,9 +5987,11 @@ class PopulationAnalyticsSystem:
         self.data['migration'] = self.data_generator.generate_migration_flows()
         
         # 5. Historical timelines
-        self.data['historical'] = {}
-        for country in ['China', 'United States', 'India']:
-            self.data['historical'][country] = self.data_generator.generate_historical_population_timeline(country)
+        timelines = self.data_generator.generate_historical_timelines(['China', 'United States', 'India'])
+        self.data['historical'] = {
+            country: frame.reset_index(drop=True)
+            for country, frame in timelines.groupby('country', sort=False, observed=True)
+        }
         
         logger.info("All datasets generated successfully")
     
@@ -3663,12 +6006,18 @@ class PopulationAnalyticsSystem:
         }
         
         for name, filepath in data_files.items():
+            if name == 'world' and self.config['processing']['out_of_core_dir'] is not None:
+                # Processed partition by partition from disk by _preprocess_all_data
+                self.world_source = filepath if os.path.exists(filepath) else None
+                continue
             if os.path.exists(filepath):
                 try:
                     if filepath.endswith('.csv'):
                         self.data[name] = pd.read_csv(filepath)
                     elif filepath.endswith('.geojson'):
                         self.data[name] = gpd.read_file(filepath)
+                    # Restore the shared country/region categoricals lost in the file round trip
+                    self.data[name] = self.data_generator.country_dictionary.categorize(self.data[name])
                     logger.info(f"Loaded {name} from {filepath}")
                 except Exception as e:
                     logger.error(f"Error loading {name}: {str(e)}")
@@ -3681,8 +6030,17 @@ class PopulationAnalyticsSystem:
         """Preprocess all datasets"""
         logger.info("Preprocessing all datasets...")
         
-        if 'world' in self.data and self.data['world'] is not None:
-            self.data['world_processed'] = self.data_processor.preprocess_world_data(self.data['world'])
+        processing = self.config['processing']
+        if self.world_source is not None:
+            self.results['world_processed_dataset'] = self.data_processor.preprocess_world_data_out_of_core(
+                self.world_source, processing['out_of_core_dir'], memory_limit_mb=processing['memory_limit_mb'])
+        elif 'world' in self.data and self.data['world'] is not None:
+            if processing['n_workers'] > 1:
+                self.data['world_processed'] = self.data_processor.preprocess_world_data_sharded(
+                    self.data['world'], n_workers=processing['n_workers'])
+            else:
+                self.data['world_processed'] = self.data_processor.preprocess_world_data(
+                    self.data['world'], track_memory=processing['track_memory'], compact=processing['compact'])
             logger.info(f"World data processed: {self.data['world_processed'].shape}")
         
         # Process other datasets as needed
@@ -3695,6 +6053,20 @@ class PopulationAnalyticsSystem:
                     for col in numeric_cols:
                         dataset[col] = dataset[col].fillna(dataset[col].median())
     
+    def append_world_data(self, new_rows: pd.DataFrame) -> None:
+        """Append newly ingested periods, updating the processed world data incrementally"""
+        dictionary = self.data_generator.country_dictionary
+        new_rows = dictionary.categorize(new_rows)
+        history = self.data.get('world')
+        self.data['world'] = dictionary.categorize(pd.concat([history, new_rows], ignore_index=True))
+        
+        if self.data.get('world_processed') is not None and self.data_processor.preprocessor.is_fitted:
+            self.data['world_processed'] = self.data_processor.preprocess_incremental(
+                self.data['world_processed'], new_rows, history=history)
+        else:
+            self._preprocess_all_data()
+        logger.info(f"World data processed: {self.data['world_processed'].shape}")
+    
     def _perform_all_analyses(self) -> None:
         """Perform all statistical analyses"""
         logger.info("Performing statistical analyses...")
@@ -3725,20 +6097,28 @@ class PopulationAnalyticsSystem:
         logger.info("Creating visualizations...")
         
         if 'world' in self.data:
+            world = self.data['world']
+            
             # 1. Comprehensive dashboards for key countries
             key_countries = ['China', 'India', 'United States', 'Japan', 'Germany']
-            
-            for country in key_countries:
-                self.visualizer.create_comprehensive_dashboard(self.data['world'], country)
+            jobs = [RenderJob(f'dashboard:{country}', self.visualizer.create_comprehensive_dashboard, (world, country))
+                    for country in key_countries]
             
             # 2. Global dashboard
-            self.visualizer.create_comprehensive_dashboard(self.data['world'])
+            jobs.append(RenderJob('dashboard:global', self.visualizer.create_comprehensive_dashboard, (world,)))
             
             # 3. Interactive visualizations
-            self.visualizer.create_interactive_visualizations(self.data['world'])
+            jobs.append(RenderJob('interactive', self.visualizer.create_interactive_visualizations, (world,)))
             
             # 4. Specialized charts
-            self.visualizer.create_specialized_charts(self.data['world'])
+            jobs.append(RenderJob('specialized', self.visualizer.create_specialized_charts, (world,)))
+            
+            # Independent jobs, rendered in parallel
+            scheduler = RenderScheduler(self.config['visualization']['n_workers'])
+            try:
+                scheduler.run(jobs)
+            finally:
+                self.results['render_timings'] = scheduler.report
         
         logger.info("All visualizations created")
     
@@ -3752,7 +6132,7 @@ class PopulationAnalyticsSystem:
             self.results['forecasts'] = {}
             
             for country in key_countries:
-                country_data = self.data['world'][self.data['world']['country'] == country]
+                country_data = country_slice(self.data['world'], country)
                 
                 if len(country_data) > 10:
                     # Prepare time series
@@ -3851,6 +6231,10 @@ class PopulationAnalyticsSystem:
                 with open('models/best_population_model.pkl', 'wb') as f:
                     pickle.dump(best_model, f)
         
+        # Save preprocessing statistics so new data can be transformed like the training data
+        if self.data_processor.preprocessor.is_fitted:
+            self.data_processor.save_preprocessor('models/preprocessor.pkl')
+        
         # Export forecasts
         if 'forecasts' in self.results:
             with open('output_data/population_forecasts.json', 'w') as f:
@@ -3963,7 +6347,7 @@ class PopulationAnalyticsSystem:
         elif analysis_type == 'forecast':
             country = kwargs.get('country', 'China')
             if 'world' in self.data:
-                country_data = self.data['world'][self.data['world']['country'] == country]
+                country_data = country_slice(self.data['world'], country)
                 if len(country_data) > 10:
                     population_series = pd.Series(
                         country_data['population'].values,
@@ -4002,11 +6386,13 @@ def main():
     """Main entry point for the population analytics system"""
     
     parser = argparse.ArgumentParser(description='Population Data Analytics System')
-    parser.add_argument('--mode', choices=['full', 'dashboard', 'forecast', 'analysis', 'export'],
+    parser.add_argument('--mode', choices=['full', 'dashboard', 'forecast', 'analysis', 'export', 'stream', 'benchmark'],
                        default='full', help='Run mode')
     parser.add_argument('--country', type=str, help='Country for specific analysis')
     parser.add_argument('--generate-data', action='store_true', help='Generate new data')
     parser.add_argument('--output-dir', type=str, default='output', help='Output directory')
+    parser.add_argument('--n-countries', type=int, help='Number of countries/synthetic regions to generate')
+    parser.add_argument('--steps-per-year', type=int, help='Time steps per year (12 for monthly panels)')
     
     args = parser.parse_args()
     
@@ -4015,6 +6401,10 @@ def main():
     
     # Initialize system
     system = PopulationAnalyticsSystem()
+    if args.n_countries:
+        system.config['data_generation']['n_countries'] = args.n_countries
+    if args.steps_per_year:
+        system.config['data_generation']['steps_per_year'] = args.steps_per_year
     
     # Run based on mode
     if args.mode == 'full':
@@ -4037,7 +6427,7 @@ def main():
                 if 'world' not in system.data:
                     system._generate_all_datasets()
                 
-                country_data = system.data['world'][system.data['world']['country'] == args.country]
+                country_data = country_slice(system.data['world'], args.country)
                 if len(country_data) > 10:
                     population_series = pd.Series(
                         country_data['population'].values,
@@ -4065,6 +6455,27 @@ def main():
     elif args.mode == 'export':
         system._export_all_results()
     
+    elif args.mode == 'stream':
+        generation_config = system.config['data_generation']
+        system.data_generator.write_world_population_parquet(
+            start_year=generation_config['start_year'],
+            end_year=generation_config['end_year'],
+            n_countries=generation_config['n_countries'],
+            steps_per_year=generation_config['steps_per_year']
+        )
+    
+    elif args.mode == 'benchmark':
+        generation_config = system.config['data_generation']
+        world = system.data_generator.generate_world_population_dataset(
+            start_year=generation_config['start_year'],
+            end_year=generation_config['end_year'],
+            n_countries=generation_config['n_countries'],
+            steps_per_year=generation_config['steps_per_year']
+        )
+        processor = system.data_processor
+        world = processor.build_pipeline(['missing_values', 'demographic', 'economic']).run(world)
+        processor.benchmark_rolling_features(world)
+    
     logger.info("Population analytics completed successfully")
 
 
@@ -4092,7 +6503,7 @@ if __name__ == "__main__":
         system._generate_all_datasets()
         
         # Get China data
-        china_data = system.data['world'][system.data['world']['country'] == 'China']
+        china_data = country_slice(system.data['world'], 'China')
         china_data = china_data.sort_values('year')
         
         # Create time series
@@ -0,0 +1,95 @@
+"""Regression tests for the feature pipeline (run with ``python -m pytest``)"""
+
+import importlib.util
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# code.py shares its name with the standard library's ``code`` module
+_spec = importlib.util.spec_from_file_location('population_code', Path(__file__).with_name('code.py'))
+population_code = importlib.util.module_from_spec(_spec)
+sys.modules['population_code'] = population_code
+_spec.loader.exec_module(population_code)
+
+logging.disable(logging.INFO)
+
+
+@pytest.fixture(scope='module')
+def world() -> pd.DataFrame:
+    return population_code.PopulationDataGenerator().generate_world_population_dataset(n_countries=5)
+
+
+def test_feature_memo_follows_reassigned_columns(world):
+    processor = population_code.PopulationDataProcessor()
+    df = world.copy()
+    before = processor.compute_features(df, ['population_lag_1'], fit=True)['population_lag_1']
+
+    df['population'] *= 2
+    after = processor.compute_features(df, ['population_lag_1'], fit=True)['population_lag_1']
+    np.testing.assert_allclose(after.to_numpy(), 2 * before.to_numpy())
+
+
+def test_feature_memo_follows_refit(world):
+    processor = population_code.PopulationDataProcessor()
+    df = world.copy()
+    before = processor.compute_features(df, ['country_encoded'], fit=True)['country_encoded']
+
+    processor.compute_features(df.assign(population=df['population'] * 2), ['country_encoded'], fit=True)
+    after = processor.compute_features(df, ['country_encoded'], fit=False)['country_encoded']
+    np.testing.assert_allclose(after.to_numpy(), 2 * before.to_numpy())
+
+
+@pytest.fixture(scope='module')
+def world_with_gaps(world) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    df = world.assign(forest_cover=rng.uniform(0, 0.7, len(world)), natural_hazards=rng.poisson(0.5, len(world)),
+                      infrastructure_quality=rng.uniform(0.2, 0.95, len(world)))
+    for col in ['birth_rate', 'death_rate', 'gdp_per_capita', 'literacy_rate']:
+        df.loc[rng.random(len(df)) < 0.15, col] = np.nan
+    countries = df['country'].astype(str)
+    first, second = countries.unique()[:2]
+    df.loc[(countries == first) & (df['year'] >= 2093), 'birth_rate'] = np.nan  # Trailing gap into the new years
+    df.loc[(countries == second) & (df['year'] <= 2097), 'death_rate'] = np.nan  # First observed in a new year
+    return df
+
+
+def assert_frames_close(expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    assert list(actual.columns) == list(expected.columns)
+    for col in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[col]) and not pd.api.types.is_bool_dtype(expected[col]):
+            np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                       rtol=1e-7, atol=1e-7, err_msg=col)
+        else:
+            assert (actual[col].astype(str).to_numpy() == expected[col].astype(str).to_numpy()).all(), col
+
+
+def test_incremental_with_gaps_matches_recompute(world_with_gaps):
+    processor = population_code.PopulationDataProcessor()
+    history = world_with_gaps[world_with_gaps['year'] <= 2095]
+    processed = processor.preprocess_world_data(history)
+    for year in range(2096, 2101):
+        new_rows = world_with_gaps[world_with_gaps['year'] == year]
+        processed = processor.preprocess_incremental(processed, new_rows, history=history)
+        history = pd.concat([history, new_rows])
+
+    expected = processor.preprocess_world_data(world_with_gaps, fit=False).reset_index(drop=True)
+    assert_frames_close(expected, processed)
+
+
+def test_incremental_without_history_fills_forward(world_with_gaps):
+    processor = population_code.PopulationDataProcessor()
+    history = world_with_gaps[world_with_gaps['year'] <= 2099]
+    processed = processor.preprocess_world_data(history).reset_index(drop=True)
+    new_rows = world_with_gaps[world_with_gaps['year'] == 2100]
+    updated = processor.preprocess_incremental(processed, new_rows)
+
+    # Processed rows keep their filled values; a gap in a new row takes the last value before it
+    old = updated['year'] <= 2099
+    np.testing.assert_array_equal(updated.loc[old, 'birth_rate'].to_numpy(), processed['birth_rate'].to_numpy())
+    first = world_with_gaps['country'].iloc[0]
+    country = updated[updated['country'] == first]
+    assert country['birth_rate'].iloc[-1] == country['birth_rate'].iloc[-2]